@@ -0,0 +1,51 @@
+import hashlib
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from foodgram.settings import TOKEN_CACHE_ENABLED, TOKEN_CACHE_TIMEOUT
+from recipe.models import User
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+# Поля для проверки прав и сериализаторов пользователя, чтобы /users/me/
+# не догружал их из БД. Хеш пароля в общий кеш не попадает, при обращении
+# он подгружается отдельным запросом.
+AUTH_FIELDS = {
+    'id', 'username', 'email', 'first_name', 'last_name',
+    'is_active', 'is_staff', 'is_superuser',
+}
+USER_FIELDS = [
+    field.attname for field in User._meta.concrete_fields
+    if field.attname in AUTH_FIELDS
+]
+
+
+def cache_key(key):
+    return f'auth:token:v2:{hashlib.sha256(key.encode()).hexdigest()}'
+
+
+def make_snapshot(user):
+    return tuple(getattr(user, field) for field in USER_FIELDS)
+
+
+def invalidate_tokens(*keys):
+    cache.delete_many([cache_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+
+    def authenticate_credentials(self, key):
+        if not TOKEN_CACHE_ENABLED:
+            return super().authenticate_credentials(key)
+        # Снимок хранится только в общем кеше: отзыв токена или блокировка
+        # пользователя сразу видны всем воркерам.
+        snapshot = cache.get(cache_key(key))
+        if snapshot is None:
+            snapshot = self.load_snapshot(key)
+            cache.set(cache_key(key), snapshot, TOKEN_CACHE_TIMEOUT)
+        user = User.from_db(DEFAULT_DB_ALIAS, USER_FIELDS, snapshot)
+        return user, Token(key=key, user=user)
+
+    def load_snapshot(self, key):
+        user, _ = super().authenticate_credentials(key)
+        return make_snapshot(user)
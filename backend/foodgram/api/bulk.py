@@ -0,0 +1,128 @@
+from django.db import IntegrityError, transaction
+from recipe.counters import (bulk_changes, change_recipe_counter,
+                             change_user_counter, recount_recipes,
+                             recount_users)
+from recipe.feed import INBOX_ENABLED, add_authors, remove_authors
+from recipe.models import (Follow, LastModified, Recipe, RecipeCart,
+                           RecipeFavorites, User)
+
+from .signals import on_commit_once
+
+BULK_RELATIONS = {
+    'favorite': (RecipeFavorites, 'recipe', 'favorites_count'),
+    'shopping_cart': (RecipeCart, 'recipe', 'cart_count'),
+    'subscribe': (Follow, 'author', 'followers_count'),
+}
+
+
+def change_counter(model, field, counter, ids, delta):
+    if not ids:
+        return
+    target = model._meta.get_field(field).related_model
+    if target is Recipe:
+        change_recipe_counter(counter, ids, delta)
+    else:
+        change_user_counter(counter, ids, delta)
+
+
+def recount_counter(model, field, ids):
+    target = model._meta.get_field(field).related_model
+    if target is Recipe:
+        recount_recipes(Recipe.objects.filter(pk__in=ids))
+    else:
+        recount_users(User.objects.filter(pk__in=ids))
+
+
+def insert_links(model, field, user, ids):
+    try:
+        with transaction.atomic():
+            model.objects.bulk_create(
+                [model(user=user, **{f'{field}_id': pk}) for pk in ids]
+            )
+        return ids
+    except IntegrityError:
+        pass
+    # Часть строк успел вставить параллельный запрос: повторяем по одной,
+    # чтобы точно знать, какие связи созданы этим запросом.
+    created = []
+    for pk in ids:
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create(
+                    [model(user=user, **{f'{field}_id': pk})]
+                )
+        except IntegrityError:
+            continue
+        created.append(pk)
+    return created
+
+
+def touch_user(model, user):
+    key = f'user:{user.id}'
+    on_commit_once(f'touch:{key}', LastModified.touch, key)
+    if model is RecipeFavorites:
+        on_commit_once('touch:popular', LastModified.touch, 'popular')
+
+
+def linked_ids(model, field, user, ids):
+    return set(model.objects.filter(
+        user=user, **{f'{field}__in': ids}
+    ).values_list(f'{field}_id', flat=True))
+
+
+@transaction.atomic
+def bulk_add(relation, user, ids, excluded=()):
+    model, field, counter = BULK_RELATIONS[relation]
+    target = model._meta.get_field(field).related_model
+    ids = list(dict.fromkeys(ids))
+    found = set(target.objects.filter(pk__in=ids).values_list(
+        'pk', flat=True
+    ))
+    existing = linked_ids(model, field, user, ids)
+    created = insert_links(model, field, user, [
+        pk for pk in ids
+        if pk in found and pk not in existing and pk not in excluded
+    ])
+    change_counter(model, field, counter, created, 1)
+    if created:
+        if model is Follow and INBOX_ENABLED:
+            add_authors(user.id, created)
+        touch_user(model, user)
+    results = []
+    for pk in ids:
+        if pk not in found:
+            result = 'not_found'
+        elif pk in excluded:
+            result = 'invalid'
+        elif pk in created:
+            result = 'created'
+        else:
+            result = 'exists'
+        results.append({'id': pk, 'status': result})
+    return results
+
+
+@transaction.atomic
+def bulk_remove(relation, user, ids):
+    model, field, counter = BULK_RELATIONS[relation]
+    ids = list(dict.fromkeys(ids))
+    existing = set(model.objects.select_for_update().filter(
+        user=user, **{f'{field}__in': ids}
+    ).values_list(f'{field}_id', flat=True))
+    if existing:
+        # Счетчики и ленты обновляются ниже один раз на всю пачку
+        with bulk_changes():
+            _, deleted = model.objects.filter(
+                user=user, **{f'{field}__in': existing}
+            ).delete()
+        if deleted.get(model._meta.label, 0) == len(existing):
+            change_counter(model, field, counter, existing, -1)
+        else:
+            recount_counter(model, field, existing)
+        if model is Follow and INBOX_ENABLED:
+            remove_authors(user.id, existing)
+        touch_user(model, user)
+    return [
+        {'id': pk, 'status': 'deleted' if pk in existing else 'missing'}
+        for pk in ids
+    ]
@@ -0,0 +1,100 @@
+import copy
+import time
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from recipe.models import Follow, RecipeCart, RecipeFavorites
+
+GENERATION_KEY = 'recipes:generation'
+CACHED_PARAMS = (
+    'author', 'compact', 'cursor', 'fields', 'limit', 'omit', 'ordering',
+    'page', 'pagination', 'search', 'tags'
+)
+USER_PARAMS = ('is_favorited', 'is_in_shopping_cart')
+# Счетчики избранного и трендовый рейтинг меняются через .update() без
+# сброса поколения, поэтому такие сортировки не кешируются.
+UNCACHED_ORDERINGS = ('popular', 'trending')
+
+
+def get_generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, time.time_ns(), None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def bump_generation():
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, time.time_ns(), None)
+
+
+def is_cacheable(request):
+    if request.query_params.get('ordering') in UNCACHED_ORDERINGS:
+        return False
+    return not any(request.query_params.get(key) for key in USER_PARAMS)
+
+
+def make_key(request):
+    params = [
+        (key, sorted(request.query_params.getlist(key)))
+        for key in CACHED_PARAMS if key in request.query_params
+    ]
+    return 'recipes:{}:{}?{}'.format(
+        get_generation(),
+        request.build_absolute_uri(request.path),
+        urlencode(params, doseq=True)
+    )
+
+
+def get_recipes(data):
+    if isinstance(data, list):
+        return data
+    if 'results' in data:
+        return data['results']
+    return [data]
+
+
+def set_user_flags(data, favorited, in_cart, subscribed):
+    for recipe in get_recipes(data):
+        if 'is_favorited' in recipe:
+            recipe['is_favorited'] = recipe['id'] in favorited
+        if 'is_in_shopping_cart' in recipe:
+            recipe['is_in_shopping_cart'] = recipe['id'] in in_cart
+        if 'author' in recipe:
+            recipe['author']['is_subscribed'] = (
+                recipe['author']['id'] in subscribed
+            )
+    return data
+
+
+def base_payload(data, user):
+    if not user.is_authenticated:
+        return data
+    return set_user_flags(copy.deepcopy(data), set(), set(), set())
+
+
+def overlay_user_flags(data, user):
+    recipes = get_recipes(data)
+    if not recipes:
+        return data
+    recipe_ids = [recipe['id'] for recipe in recipes]
+    author_ids = {
+        recipe['author']['id'] for recipe in recipes if 'author' in recipe
+    }
+    favorited = in_cart = subscribed = set()
+    if 'is_favorited' in recipes[0]:
+        favorited = set(RecipeFavorites.objects.filter(
+            user=user, recipe__in=recipe_ids
+        ).values_list('recipe', flat=True))
+    if 'is_in_shopping_cart' in recipes[0]:
+        in_cart = set(RecipeCart.objects.filter(
+            user=user, recipe__in=recipe_ids
+        ).values_list('recipe', flat=True))
+    if author_ids:
+        subscribed = set(Follow.objects.filter(
+            user=user, author__in=author_ids
+        ).values_list('author', flat=True))
+    return set_user_flags(data, favorited, in_cart, subscribed)
@@ -0,0 +1,83 @@
+import logging
+import time
+
+import django
+from django.core.signals import request_finished, request_started
+from django.db import connections
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from foodgram.settings import DB_CONN_HEALTH_CHECKS, DB_METRICS_HOOK
+
+logger = logging.getLogger(__name__)
+
+# В Django 4.1+ проверку выполняет сам фреймворк по CONN_HEALTH_CHECKS.
+LEGACY_HEALTH_CHECKS = DB_CONN_HEALTH_CHECKS and django.VERSION < (4, 1)
+
+
+def log_metrics(metrics):
+    logger.debug('db connection %s', metrics)
+
+
+metrics_hook = import_string(DB_METRICS_HOOK) if DB_METRICS_HOOK else None
+
+
+def install_connection_timing():
+    original = BaseDatabaseWrapper.ensure_connection
+    if getattr(original, 'instrumented', False):
+        return
+
+    def ensure_connection(self):
+        metrics = getattr(self, 'request_metrics', None)
+        if self.connection is not None and getattr(
+            self, 'health_check_pending', False
+        ):
+            self.health_check_pending = False
+            if not self.is_usable():
+                self.close()
+                if metrics is not None:
+                    metrics['unusable'] = True
+        if self.connection is not None or metrics is None:
+            return original(self)
+        started = time.perf_counter()
+        try:
+            return original(self)
+        finally:
+            metrics['connect_ms'] = round(
+                (time.perf_counter() - started) * 1000, 2
+            )
+
+    ensure_connection.instrumented = True
+    BaseDatabaseWrapper.ensure_connection = ensure_connection
+
+
+@receiver(request_started)
+def start_connection_metrics(sender, **kwargs):
+    for connection in connections.all():
+        connection.health_check_pending = LEGACY_HEALTH_CHECKS
+        if metrics_hook is not None:
+            connection.request_metrics = {
+                'alias': connection.alias,
+                'reused': connection.connection is not None,
+                'connect_ms': 0.0,
+                'unusable': False,
+            }
+
+
+@receiver(request_finished)
+def report_connection_metrics(sender, **kwargs):
+    if metrics_hook is None:
+        return
+    for connection in connections.all():
+        metrics = getattr(connection, 'request_metrics', None)
+        if metrics is None:
+            continue
+        connection.request_metrics = None
+        try:
+            metrics_hook(metrics)
+        except Exception:
+            logger.exception('Ошибка в DB_METRICS_HOOK')
+
+
+if LEGACY_HEALTH_CHECKS or metrics_hook is not None:
+    install_connection_timing()
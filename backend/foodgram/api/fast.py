@@ -0,0 +1,70 @@
+from foodgram.settings import RECIPE_IMAGE_RENDITIONS
+from recipe.models import Recipe
+
+TAG_FIELDS = ('id', 'name', 'color', 'slug')
+INGREDIENT_FIELDS = ('id', 'name', 'measurement_unit')
+SHORT_RECIPE_FIELDS = (
+    'id', 'name', 'image', 'image_renditions', 'cooking_time'
+)
+
+
+def image_url(storage, name, request=None):
+    url = storage.url(name)
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def rendition_urls(storage, name, renditions, request=None):
+    if not name:
+        return {}
+    if renditions.get('source') != name:
+        renditions = {}
+    return {
+        size_name: image_url(
+            storage, renditions.get(size_name, name), request
+        )
+        for size_name in RECIPE_IMAGE_RENDITIONS
+    }
+
+
+def tag_rows(queryset):
+    return list(queryset.values(*TAG_FIELDS))
+
+
+def ingredient_rows(queryset):
+    return list(queryset.values(*INGREDIENT_FIELDS))
+
+
+def short_recipe(row, storage, request=None):
+    name = row['image']
+    return {
+        'id': row['id'],
+        'name': row['name'],
+        'image': image_url(storage, name, request) if name else None,
+        'image_renditions': rendition_urls(
+            storage, name, row['image_renditions'], request
+        ),
+        'cooking_time': row['cooking_time'],
+    }
+
+
+def short_recipe_rows(queryset, request=None):
+    storage = Recipe._meta.get_field('image').storage
+    return [
+        short_recipe(row, storage, request)
+        for row in queryset.values(*SHORT_RECIPE_FIELDS)
+    ]
+
+
+def recipe_previews(author_ids, limit=None):
+    recipes = Recipe.objects.filter(author__in=author_ids)
+    if limit:
+        recipes = recipes.limit_per_author(limit)
+    storage = Recipe._meta.get_field('image').storage
+    previews = {author_id: [] for author_id in author_ids}
+    for row in recipes.order_by('id').values(
+        'author', *SHORT_RECIPE_FIELDS
+    ):
+        previews[row['author']].append(short_recipe(row, storage))
+    return previews
@@ -1,7 +1,14 @@
 import django_filters
 from recipe.models import Tag
+from recipe.search import search_recipes
 
 flag_choises = ((0, False), (1, True))
+ordering_choices = (('popular', 'popular'), ('trending', 'trending'))
+
+RECIPE_ORDERINGS = {
+    'popular': ('-favorites_count', '-id'),
+    'trending': ('-trending_score', '-id'),
+}
 
 
 class IngredientFilter(django_filters.FilterSet):
@@ -23,6 +30,17 @@ class RecipeFilter(django_filters.FilterSet):
         queryset=Tag.objects.all()
     )
     author = django_filters.NumberFilter()
+    search = django_filters.CharFilter(method='get_search')
+    ordering = django_filters.ChoiceFilter(
+        method='get_ordering',
+        choices=ordering_choices
+    )
+
+    def get_search(self, queryset, field_name, value):
+        return search_recipes(queryset, value)
+
+    def get_ordering(self, queryset, field_name, value):
+        return queryset.order_by(*RECIPE_ORDERINGS[value])
 
     def get_is_favorited(self, queryset, field_name, value):
         if not self.request.user.is_authenticated:
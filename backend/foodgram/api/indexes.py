@@ -0,0 +1,63 @@
+import threading
+import time
+from bisect import bisect_left
+
+from foodgram.settings import INGREDIENT_INDEX_TTL, INGREDIENT_SEARCH_LIMIT
+from recipe.models import Ingredient, LastModified
+
+
+class IngredientIndex:
+    def __init__(self, ttl=INGREDIENT_INDEX_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._keys = None
+        self._rows = None
+        self._built_at = 0
+        self.last_modified = None
+
+    def invalidate(self):
+        with self._lock:
+            self._keys = None
+            self._rows = None
+
+    def _is_stale(self):
+        if self._rows is None:
+            return True
+        return bool(self.ttl) and time.monotonic() - self._built_at > self.ttl
+
+    def _load(self):
+        with self._lock:
+            if self._is_stale():
+                last_modified = LastModified.get('ingredient')
+                rows = sorted(
+                    Ingredient.objects.values(
+                        'id', 'name', 'measurement_unit'
+                    ),
+                    key=lambda row: (row['name'].lower(), row['id'])
+                )
+                self._keys = [row['name'].lower() for row in rows]
+                self._rows = rows
+                self._built_at = time.monotonic()
+                self.last_modified = last_modified
+            return self._keys, self._rows
+
+    def get_last_modified(self):
+        self._load()
+        return self.last_modified
+
+    def search(self, prefix, limit=INGREDIENT_SEARCH_LIMIT):
+        keys, rows = self._load()
+        prefix = prefix.lower()
+        result = []
+        position = bisect_left(keys, prefix)
+        while (
+            position < len(keys)
+            and len(result) < limit
+            and keys[position].startswith(prefix)
+        ):
+            result.append(rows[position])
+            position += 1
+        return result
+
+
+ingredient_index = IngredientIndex()
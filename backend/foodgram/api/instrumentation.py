@@ -0,0 +1,109 @@
+import hashlib
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+from rest_framework.serializers import BaseSerializer
+
+IN_PLACEHOLDERS = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+
+_state = threading.local()
+
+
+def fingerprint(sql):
+    return IN_PLACEHOLDERS.sub('(%s, ...)', sql)
+
+
+def current_recorder():
+    return getattr(_state, 'recorder', None)
+
+
+class QueryRecorder:
+
+    def __init__(self):
+        self.count = 0
+        self.db_time = 0.0
+        self.fingerprints = Counter()
+        self.timings = defaultdict(float)
+        self.active = set()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    @contextmanager
+    def capture(self):
+        previous = current_recorder()
+        _state.recorder = self
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(self))
+                yield self
+        finally:
+            _state.recorder = previous
+
+    @contextmanager
+    def measure(self, name):
+        if name in self.active:
+            yield
+            return
+        self.active.add(name)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] += time.perf_counter() - started
+            self.active.discard(name)
+
+    def add(self, name, duration):
+        self.timings[name] += duration
+
+    def duplicates(self):
+        return [
+            {
+                'fingerprint': hashlib.md5(sql.encode()).hexdigest()[:12],
+                'count': count,
+                'sql': sql[:200],
+            }
+            for sql, count in self.fingerprints.most_common()
+            if count > 1
+        ]
+
+
+def install_serializer_timing():
+    # Время сериализации считается по верхнеуровневому обращению к .data,
+    # вложенные сериализаторы входят в него же.
+    original = BaseSerializer.data
+    if getattr(original.fget, 'instrumented', False):
+        return
+
+    def data(self):
+        recorder = current_recorder()
+        if recorder is None:
+            return original.fget(self)
+        with recorder.measure('serialize'):
+            return original.fget(self)
+
+    data.instrumented = True
+    BaseSerializer.data = property(data)
+
+
+@contextmanager
+def max_queries(budget):
+    recorder = QueryRecorder()
+    with recorder.capture():
+        yield recorder
+    if recorder.count > budget:
+        lines = [f'Выполнено запросов: {recorder.count}, лимит: {budget}']
+        for duplicate in recorder.duplicates():
+            lines.append(f'{duplicate["count"]} x {duplicate["sql"]}')
+        raise AssertionError('\n'.join(lines))
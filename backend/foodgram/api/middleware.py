@@ -0,0 +1,81 @@
+import json
+import logging
+import time
+
+from django.core.exceptions import MiddlewareNotUsed
+from foodgram.settings import QUERY_INSTRUMENTATION, SERIALIZER_TIMING
+
+from .instrumentation import QueryRecorder, install_serializer_timing
+
+logger = logging.getLogger(__name__)
+
+
+class QueryInstrumentationMiddleware:
+
+    def __init__(self, get_response):
+        if not QUERY_INSTRUMENTATION:
+            raise MiddlewareNotUsed
+        if SERIALIZER_TIMING:
+            install_serializer_timing()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        request.query_recorder = recorder
+        started = time.perf_counter()
+        with recorder.capture():
+            response = self.get_response(request)
+        if response.streaming:
+            response.streaming_content = self.stream(
+                response.streaming_content, request, response, recorder,
+                started
+            )
+        else:
+            self.log(request, response, recorder, started)
+        response['Server-Timing'] = self.server_timing(recorder, started)
+        return response
+
+    def process_template_response(self, request, response):
+        started = time.perf_counter()
+        response.add_post_render_callback(
+            lambda rendered: request.query_recorder.add(
+                'render', time.perf_counter() - started
+            )
+        )
+        return response
+
+    def stream(self, content, request, response, recorder, started):
+        with recorder.capture():
+            yield from content
+        self.log(request, response, recorder, started)
+
+    def server_timing(self, recorder, started):
+        metrics = [
+            f'db;dur={recorder.db_time * 1000:.1f};'
+            f'desc="{recorder.count} queries, '
+            f'{len(recorder.duplicates())} duplicated"'
+        ]
+        for name in ('serialize', 'render'):
+            if name in recorder.timings:
+                metrics.append(
+                    f'{name};dur={recorder.timings[name] * 1000:.1f}'
+                )
+        total = (time.perf_counter() - started) * 1000
+        metrics.append(f'total;dur={total:.1f}')
+        return ', '.join(metrics)
+
+    def log(self, request, response, recorder, started):
+        duplicates = recorder.duplicates()
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': recorder.count,
+            'db_ms': round(recorder.db_time * 1000, 1),
+            'serialize_ms': round(recorder.timings['serialize'] * 1000, 1),
+            'render_ms': round(recorder.timings['render'] * 1000, 1),
+            'total_ms': round((time.perf_counter() - started) * 1000, 1),
+            'duplicates': duplicates,
+        }
+        level = logging.WARNING if duplicates else logging.INFO
+        logger.log(level, json.dumps(record, ensure_ascii=False))
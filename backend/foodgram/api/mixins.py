@@ -1,4 +1,16 @@
+from calendar import timegm
+from hashlib import md5
+
+from django.core.cache import cache
+from django.utils.cache import (get_conditional_response, patch_vary_headers,
+                                quote_etag)
+from django.utils.http import http_date
+from foodgram.settings import RECIPE_CACHE_TIMEOUT
 from rest_framework import mixins, viewsets
+from rest_framework.response import Response
+
+from .caching import base_payload, is_cacheable, make_key, overlay_user_flags
+from .paginations import CustomCursorPagination
 
 
 class ListViewSet(
@@ -6,3 +18,82 @@ class ListViewSet(
     viewsets.GenericViewSet
 ):
     pass
+
+
+class CursorPaginationMixin:
+    cursor_pagination_class = CustomCursorPagination
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if self.request.query_params.get('pagination') == 'cursor':
+                self._paginator = self.cursor_pagination_class()
+            else:
+                self._paginator = super().paginator
+        return self._paginator
+
+
+class CachedRetrieveListMixin:
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def cached_response(self, action, request, *args, **kwargs):
+        if not is_cacheable(request):
+            return action(request, *args, **kwargs)
+        key = make_key(request)
+        data = cache.get(key)
+        if data is None:
+            response = action(request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(
+                    key,
+                    base_payload(response.data, request.user),
+                    RECIPE_CACHE_TIMEOUT
+                )
+            return response
+        if request.user.is_authenticated:
+            overlay_user_flags(data, request.user)
+        return Response(data)
+
+
+class ConditionalGetMixin:
+
+    def get_last_modified(self, request, *args, **kwargs):
+        return None
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def conditional_response(self, action, request, *args, **kwargs):
+        last_modified = self.get_last_modified(request, *args, **kwargs)
+        if last_modified is None:
+            return action(request, *args, **kwargs)
+        etag = quote_etag(md5('{}:{}:{}'.format(
+            request.user.id,
+            last_modified.isoformat(),
+            request.get_full_path()
+        ).encode()).hexdigest())
+        timestamp = timegm(last_modified.utctimetuple())
+        response = get_conditional_response(
+            request._request, etag=etag, last_modified=timestamp
+        )
+        if response is None:
+            response = action(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(timestamp)
+        patch_vary_headers(response, ['Authorization'])
+        return response
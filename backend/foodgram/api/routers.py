@@ -0,0 +1,65 @@
+import hashlib
+import random
+import threading
+
+from django.core.cache import cache
+from foodgram.settings import DATABASES, DB_REPLICA_STICKY_SECONDS, DB_REPLICAS
+from rest_framework.permissions import SAFE_METHODS
+
+PRIMARY = 'default'
+REPLICAS = [alias for alias in DATABASES if alias != PRIMARY]
+# Токен читается сразу после входа, реплика может еще не получить его
+PRIMARY_MODELS = {'authtoken.token'}
+
+_state = threading.local()
+
+
+def use_replicas(enabled):
+    _state.replicas = enabled
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if model._meta.label_lower in PRIMARY_MODELS:
+            return PRIMARY
+        if REPLICAS and getattr(_state, 'replicas', False):
+            return random.choice(REPLICAS)
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
+
+
+def sticky_key(request):
+    authorization = request.META.get('HTTP_AUTHORIZATION')
+    if not authorization:
+        return None
+    digest = hashlib.sha256(authorization.encode()).hexdigest()
+    return f'db:primary:{digest}'
+
+
+class ReplicaRoutingMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not DB_REPLICAS:
+            return self.get_response(request)
+        key = sticky_key(request)
+        safe = request.method in SAFE_METHODS
+        use_replicas(safe and not (key and cache.get(key)))
+        try:
+            response = self.get_response(request)
+        finally:
+            use_replicas(False)
+        if not safe and key:
+            cache.set(key, True, DB_REPLICA_STICKY_SECONDS)
+        return response
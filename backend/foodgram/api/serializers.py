@@ -1,12 +1,16 @@
 import webcolors
-from django.shortcuts import get_object_or_404
+from django.db import models, transaction
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from drf_extra_fields.fields import Base64ImageField
+from foodgram.settings import BULK_MAX_IDS
 from recipe.models import (Follow, Ingredient, Recipe, RecipeCart,
                            RecipeFavorites, RecipeIngredient, RecipeTag, Tag,
-                           User)
+                           User, UserStats)
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+from .fast import recipe_previews, rendition_urls
 
 
 class CustomUserSerializer(UserSerializer):
@@ -20,6 +24,8 @@ class CustomUserSerializer(UserSerializer):
         ]
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request_user_id = self.context.get('request').user.id
         return Follow.objects.filter(
             author=obj.id,
@@ -88,6 +94,38 @@ class FollowSerializer(serializers.ModelSerializer):
         return data
 
 
+class BulkIdsSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=BULK_MAX_IDS
+    )
+
+
+def get_recipes_limit(request):
+    if request is None:
+        return None
+    recipes_limit = request.query_params.get('recipes_limit')
+    if recipes_limit:
+        return int(recipes_limit)
+    return None
+
+
+class FollowUserListSerializer(serializers.ListSerializer):
+
+    def to_representation(self, data):
+        if isinstance(data, models.manager.BaseManager):
+            data = data.all()
+        users = list(data)
+        previews = recipe_previews(
+            [user.id for user in users],
+            get_recipes_limit(self.context.get('request'))
+        )
+        for user in users:
+            user.recipes_preview = previews[user.id]
+        return super().to_representation(users)
+
+
 class FollowUserSerializer(serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField()
     recipes = serializers.SerializerMethodField()
@@ -99,8 +137,11 @@ class FollowUserSerializer(serializers.ModelSerializer):
             'email', 'id', 'username', 'first_name', 'last_name',
             'is_subscribed', 'recipes', 'recipes_count'
         ]
+        list_serializer_class = FollowUserListSerializer
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request_user_id = self.context.get('request').user.id
         return Follow.objects.filter(
             author=obj.id,
@@ -108,25 +149,42 @@ class FollowUserSerializer(serializers.ModelSerializer):
         ).exists()
 
     def get_recipes(self, obj):
-        recipes_limit = self.context.get('request').query_params.get(
-            'recipes_limit'
-        )
-        if recipes_limit:
-            recipes = Recipe.objects.filter(author=obj)[:int(recipes_limit)]
-        else:
-            recipes = Recipe.objects.filter(author=obj)
-        serializer = ShortRecipeSerializer(instance=recipes, many=True)
-        return serializer.data
+        if hasattr(obj, 'recipes_preview'):
+            return obj.recipes_preview
+        return recipe_previews(
+            [obj.id], get_recipes_limit(self.context.get('request'))
+        )[obj.id]
 
     def get_recipes_count(self, obj):
-        return Recipe.objects.filter(author=obj).count()
+        if hasattr(obj, 'recipes_count'):
+            return obj.recipes_count
+        return UserStats.objects.filter(user=obj).values_list(
+            'recipes_count', flat=True
+        ).first() or 0
+
+
+class ImageRenditionsField(serializers.Field):
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        return rendition_urls(
+            recipe.image.storage,
+            recipe.image.name,
+            recipe.image_renditions,
+            self.context.get('request')
+        )
 
 
 class ShortRecipeSerializer(serializers.ModelSerializer):
+    image_renditions = ImageRenditionsField()
 
     class Meta:
         model = Recipe
-        fields = ['id', 'name', 'image', 'cooking_time']
+        fields = ['id', 'name', 'image', 'image_renditions', 'cooking_time']
 
 
 class FavoriteSerializer(serializers.ModelSerializer):
@@ -163,8 +221,19 @@ class CartSerializer(serializers.ModelSerializer):
         return data
 
 
+class IngredientIdField(serializers.PrimaryKeyRelatedField):
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
 class RecipeIngredientSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(
+    id = IngredientIdField(
         source='ingredient',
         queryset=Ingredient.objects.all(),
         read_only=False
@@ -179,7 +248,49 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
         fields = ['amount', 'id', 'name', 'measurement_unit']
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+def split_fields(value):
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def requested_fields(request, available, compact_fields=()):
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    params = request.query_params
+    if params.get('compact') == '1':
+        fields = set(compact_fields)
+    elif 'fields' in params:
+        fields = split_fields(params['fields'])
+    else:
+        fields = set(available)
+    omit = split_fields(params.get('omit', ''))
+    unknown = (fields | omit) - set(available)
+    if unknown:
+        raise ValidationError(
+            {'fields': [f'Неизвестные поля: {", ".join(sorted(unknown))}']},
+            code='invalid',
+        )
+    fields = (fields - omit) | {'id'}
+    if fields == set(available):
+        return None
+    return fields
+
+
+class SparseFieldsMixin:
+    compact_fields = ()
+
+    def get_fields(self):
+        fields = super().get_fields()
+        names = requested_fields(
+            self.context.get('request'), fields, self.compact_fields
+        )
+        if names is None:
+            return fields
+        return {
+            name: field for name, field in fields.items() if name in names
+        }
+
+
+class RecipeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     tags = TagSerializer(many=True, read_only=True)
     author = CustomUserSerializer(many=False, read_only=True)
     ingredients = RecipeIngredientSerializer(
@@ -188,6 +299,11 @@ class RecipeSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
     image = Base64ImageField()
+    image_renditions = ImageRenditionsField()
+    compact_fields = (
+        'id', 'name', 'image', 'image_renditions', 'cooking_time', 'tags',
+        'is_favorited', 'is_in_shopping_cart'
+    )
 
     def to_internal_value(self, data):
         tags_id = data.get('tags')
@@ -198,8 +314,8 @@ class RecipeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Recipe
         fields = [
-            'id', 'name', 'image', 'text', 'cooking_time', 'tags',
-            'author', 'ingredients', 'is_favorited',
+            'id', 'name', 'image', 'image_renditions', 'text',
+            'cooking_time', 'tags', 'author', 'ingredients', 'is_favorited',
             'is_in_shopping_cart'
         ]
         read_only_fields = ['id']
@@ -211,31 +327,54 @@ class RecipeSerializer(serializers.ModelSerializer):
                 {'tags': ['Определите теги']},
                 code='invalid',
             )
-        else:
-            for tag_id in tags:
-                if not Tag.objects.filter(pk=tag_id).exists():
-                    raise ValidationError(
-                        {'tags': ['Некорректный идентификатор тега']},
-                        code='invalid',
-                    )
-            if len(tags) != len(set(tags)):
-                raise ValidationError(
-                    {'tags': ['Неуникальные идентификаторы тегов']},
-                    code='invalid',
-                )
+        if tags:
+            data['tags'] = self.validate_tag_ids(tags)
         ingredients = data.get('recipeingredient_set')
         if ingredients:
-            existing_ingredients = []
-            for recipe_ingredient in ingredients:
-                ingredient = recipe_ingredient['ingredient']
-                if ingredient in existing_ingredients:
-                    raise serializers.ValidationError(
-                        'Неуникальные ингредиенты'
-                    )
-                existing_ingredients.append(ingredient)
+            self.resolve_ingredients(ingredients)
         return data
 
+    def validate_tag_ids(self, tags):
+        try:
+            tag_ids = [int(tag_id) for tag_id in tags]
+        except (TypeError, ValueError):
+            raise ValidationError(
+                {'tags': ['Некорректный идентификатор тега']},
+                code='invalid',
+            )
+        unique_tag_ids = set(tag_ids)
+        if Tag.objects.filter(pk__in=unique_tag_ids).count() != len(
+            unique_tag_ids
+        ):
+            raise ValidationError(
+                {'tags': ['Некорректный идентификатор тега']},
+                code='invalid',
+            )
+        if len(tag_ids) != len(unique_tag_ids):
+            raise ValidationError(
+                {'tags': ['Неуникальные идентификаторы тегов']},
+                code='invalid',
+            )
+        return tag_ids
+
+    def resolve_ingredients(self, ingredients):
+        ingredient_ids = [item['ingredient'] for item in ingredients]
+        if len(ingredient_ids) != len(set(ingredient_ids)):
+            raise serializers.ValidationError(
+                'Неуникальные ингредиенты'
+            )
+        found = Ingredient.objects.in_bulk(ingredient_ids)
+        if len(found) != len(ingredient_ids):
+            raise ValidationError(
+                {'ingredients': ['Некорректный идентификатор ингредиента']},
+                code='invalid',
+            )
+        for item in ingredients:
+            item['ingredient'] = found[item['ingredient']]
+
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         request_user_id = self.context.get('request').user.id
         return RecipeFavorites.objects.filter(
             user=request_user_id,
@@ -243,6 +382,8 @@ class RecipeSerializer(serializers.ModelSerializer):
         ).exists()
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         request_user_id = self.context.get('request').user.id
         return RecipeCart.objects.filter(
             user=request_user_id,
@@ -261,10 +402,47 @@ class RecipeSerializer(serializers.ModelSerializer):
         RecipeTag.objects.bulk_create(
             [RecipeTag(
                 recipe=recipe,
-                tag=get_object_or_404(Tag, id=tag)
-            ) for tag in tags]
+                tag_id=tag_id
+            ) for tag_id in tags]
         )
 
+    def recipe_ingredient_update(self, recipe, recipe_ingredient_data):
+        current = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in RecipeIngredient.objects.filter(
+                recipe=recipe
+            )
+        }
+        changed = []
+        added = []
+        for ingredients in recipe_ingredient_data:
+            recipe_ingredient = current.pop(ingredients['ingredient'].id, None)
+            if recipe_ingredient is None:
+                added.append(ingredients)
+            elif recipe_ingredient.amount != ingredients['amount']:
+                recipe_ingredient.amount = ingredients['amount']
+                changed.append(recipe_ingredient)
+        if current:
+            RecipeIngredient.objects.filter(
+                pk__in=[item.pk for item in current.values()]
+            ).delete()
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ['amount'])
+        if added:
+            self.recipe_ingredient_create(recipe, added)
+
+    def recipe_tag_update(self, recipe, tags):
+        current = set(RecipeTag.objects.filter(recipe=recipe).values_list(
+            'tag_id', flat=True
+        ))
+        removed = current - set(tags)
+        if removed:
+            RecipeTag.objects.filter(recipe=recipe, tag__in=removed).delete()
+        added = [tag_id for tag_id in tags if tag_id not in current]
+        if added:
+            self.recipe_tag_create(recipe, added)
+
+    @transaction.atomic
     def create(self, validated_data):
         recipe_ingredient_data = validated_data.pop('recipeingredient_set')
         tags = validated_data.pop('tags')
@@ -278,14 +456,17 @@ class RecipeSerializer(serializers.ModelSerializer):
         self.recipe_tag_create(instance, tags)
         return instance
 
+    @transaction.atomic
     def update(self, instance, validated_data):
+        # Блокировка рецепта упорядочивает параллельные PATCH, а текущие
+        # ингредиенты и теги читаются уже внутри транзакции, а не из
+        # prefetch, сделанного до нее.
+        Recipe.objects.select_for_update().filter(pk=instance.pk).exists()
         recipeingredient_set = validated_data.pop('recipeingredient_set', None)
         if recipeingredient_set:
-            instance.recipeingredient_set.all().delete()
-            self.recipe_ingredient_create(instance, recipeingredient_set)
+            self.recipe_ingredient_update(instance, recipeingredient_set)
         tags = validated_data.pop('tags', None)
         if tags:
-            instance.recipetag_set.all().delete()
-            self.recipe_tag_create(instance, tags)
+            self.recipe_tag_update(instance, tags)
         super().update(instance, validated_data)
         return instance
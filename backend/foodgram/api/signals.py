@@ -0,0 +1,151 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from recipe.images import needs_renditions, schedule_renditions
+from recipe.models import (Follow, Ingredient, LastModified, Recipe,
+                           RecipeCart, RecipeFavorites, RecipeIngredient,
+                           RecipeTag, Tag, User)
+from recipe.search import update_search_index
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate_tokens
+from .caching import bump_generation
+from .indexes import ingredient_index
+
+AUTHOR_FIELDS = {'username', 'first_name', 'last_name', 'email'}
+
+
+def on_commit_once(key, func, *args):
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        func(*args)
+        return
+    pending = connection.__dict__.setdefault('commit_once', {})
+    queued = pending.get(key)
+    # После отката точки сохранения колбэк пропадает из очереди, поэтому
+    # ключ считается занятым, только пока его колбэк еще ждет коммита.
+    if queued is not None and any(
+        queued in entry for entry in connection.run_on_commit
+    ):
+        return
+
+    def callback():
+        if pending.get(key) is callback:
+            del pending[key]
+        func(*args)
+
+    pending[key] = callback
+    transaction.on_commit(callback)
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+def invalidate_ingredient_index(sender, **kwargs):
+    on_commit_once('ingredient_index', ingredient_index.invalidate)
+
+
+@receiver([post_save, post_delete], sender=Recipe)
+@receiver([post_save, post_delete], sender=RecipeIngredient)
+@receiver([post_save, post_delete], sender=RecipeTag)
+@receiver([post_save, post_delete], sender=Tag)
+@receiver([post_save, post_delete], sender=Ingredient)
+def invalidate_recipe_cache(sender, **kwargs):
+    on_commit_once('recipe_cache', bump_generation)
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_data(sender, created, update_fields, **kwargs):
+    # Данные автора встроены в ответы с рецептами; вход в систему меняет
+    # только last_login и кеш не сбрасывает.
+    if created or (
+        update_fields is not None
+        and not set(update_fields) & AUTHOR_FIELDS
+    ):
+        return
+    on_commit_once('recipe_cache', bump_generation)
+    on_commit_once('touch:author', LastModified.touch, 'author')
+
+
+@receiver([post_save, post_delete], sender=Recipe)
+@receiver([post_save, post_delete], sender=RecipeIngredient)
+@receiver([post_save, post_delete], sender=RecipeTag)
+def touch_recipes(sender, **kwargs):
+    on_commit_once('touch:recipe', LastModified.touch, 'recipe')
+
+
+@receiver([post_save, post_delete], sender=Tag)
+def touch_tags(sender, **kwargs):
+    on_commit_once('touch:tag', LastModified.touch, 'tag')
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+def touch_ingredients(sender, **kwargs):
+    on_commit_once('touch:ingredient', LastModified.touch, 'ingredient')
+
+
+@receiver([post_save, post_delete], sender=RecipeFavorites)
+@receiver([post_save, post_delete], sender=RecipeCart)
+@receiver([post_save, post_delete], sender=Follow)
+def touch_user(sender, instance, **kwargs):
+    key = f'user:{instance.user_id}'
+    on_commit_once(f'touch:{key}', LastModified.touch, key)
+
+
+@receiver([post_save, post_delete], sender=RecipeFavorites)
+def touch_popular(sender, **kwargs):
+    on_commit_once('touch:popular', LastModified.touch, 'popular')
+
+
+@receiver(post_save, sender=Recipe)
+def process_recipe_image(sender, instance, **kwargs):
+    if needs_renditions(instance):
+        on_commit_once(
+            f'renditions:{instance.pk}', schedule_renditions, instance.pk
+        )
+
+
+@receiver([post_save, post_delete], sender=Recipe)
+def update_recipe_search(sender, instance, **kwargs):
+    on_commit_once(
+        f'search:{instance.pk}', update_search_index, [instance.pk]
+    )
+
+
+@receiver([post_save, post_delete], sender=RecipeIngredient)
+def update_recipe_ingredient_search(sender, instance, **kwargs):
+    # Удаление ингредиента доходит сюда каскадом по его строкам в рецептах.
+    on_commit_once(
+        f'search:{instance.recipe_id}',
+        update_search_index,
+        [instance.recipe_id]
+    )
+
+
+@receiver(post_save, sender=Ingredient)
+def update_ingredient_search(sender, instance, created, **kwargs):
+    if created:
+        return
+    on_commit_once(
+        f'search:ingredient:{instance.pk}',
+        update_search_index,
+        Recipe.objects.filter(ingredients=instance).values_list(
+            'pk', flat=True
+        )
+    )
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_token(sender, instance, **kwargs):
+    # Повторная очистка после коммита: параллельный запрос мог успеть
+    # закешировать токен, пока транзакция с удалением не завершилась.
+    invalidate_tokens(instance.key)
+    on_commit_once(f'token:{instance.key}', invalidate_tokens, instance.key)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_tokens(sender, instance, **kwargs):
+    keys = list(Token.objects.filter(user=instance).values_list(
+        'key', flat=True
+    ))
+    if keys:
+        invalidate_tokens(*keys)
+        on_commit_once(f'tokens:{instance.pk}', invalidate_tokens, *keys)
@@ -0,0 +1,64 @@
+from urllib.parse import urlsplit
+
+from recipe.models import Ingredient, Recipe, Tag
+from rest_framework.renderers import JSONRenderer
+
+from .fast import ingredient_rows, short_recipe_rows, tag_rows
+from .instrumentation import max_queries
+from .serializers import (IngredientSerializer, ShortRecipeSerializer,
+                          TagSerializer)
+
+QUERY_BUDGETS = {
+    '/api/recipes/': 6,
+    '/api/users/subscriptions/': 3,
+    '/api/recipes/download_shopping_cart/': 1,
+}
+
+
+class QueryBudgetMixin:
+    query_budgets = QUERY_BUDGETS
+
+    def assertQueryBudget(self, url, budget=None, method='get', client=None,
+                          **kwargs):
+        if budget is None:
+            budget = self.query_budgets[urlsplit(url).path]
+        client = client or self.client
+        with max_queries(budget):
+            response = getattr(client, method)(url, **kwargs)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return response
+
+
+def fast_path_cases():
+    recipes = Recipe.objects.order_by('id')
+    return {
+        'tags': (
+            lambda: TagSerializer(Tag.objects.all(), many=True).data,
+            lambda: tag_rows(Tag.objects.all()),
+        ),
+        'ingredients': (
+            lambda: IngredientSerializer(
+                Ingredient.objects.all(), many=True
+            ).data,
+            lambda: ingredient_rows(Ingredient.objects.all()),
+        ),
+        'recipe_previews': (
+            lambda: ShortRecipeSerializer(recipes, many=True).data,
+            lambda: short_recipe_rows(recipes),
+        ),
+    }
+
+
+class FastPathParityMixin:
+
+    def assertFastPathParity(self, names=None):
+        renderer = JSONRenderer()
+        for name, (serializer_call, fast_call) in fast_path_cases().items():
+            if names is not None and name not in names:
+                continue
+            self.assertEqual(
+                renderer.render(fast_call()),
+                renderer.render(serializer_call()),
+                name
+            )
@@ -0,0 +1,273 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from recipe.models import (Follow, Ingredient, LastModified, Recipe,
+                           RecipeCart, RecipeFavorites, RecipeIngredient,
+                           RecipeTag, Tag, User)
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase, APITransactionTestCase
+
+from . import routers
+from .serializers import (IngredientSerializer, ShortRecipeSerializer,
+                          TagSerializer)
+from .testing import FastPathParityMixin, QueryBudgetMixin
+
+# Реплика в тестах - зеркало основной тестовой БД, так что роутер можно
+# проверить по тому, через какое соединение прошли запросы.
+REPLICA = 'replica_test'
+connections.settings.setdefault(REPLICA, {
+    **connections.settings[routers.PRIMARY],
+    'TEST': {
+        **connections.settings[routers.PRIMARY]['TEST'],
+        'MIRROR': routers.PRIMARY,
+    },
+})
+
+
+class FoodgramDataMixin:
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(
+                username=f'user{index}',
+                email=f'user{index}@foodgram.ru',
+                password='pass',
+                first_name='Имя',
+                last_name='Фамилия'
+            )
+            for index in range(4)
+        ]
+        cls.user = cls.users[0]
+        cls.tags = [
+            Tag.objects.create(name=name, color=color, slug=slug)
+            for name, color, slug in (
+                ('Завтрак', '#ff0000', 'breakfast'),
+                ('Обед', '#00ff00', 'lunch'),
+                ('Ужин', '#0000ff', 'dinner'),
+            )
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {index}', measurement_unit='г'
+            )
+            for index in range(10)
+        ]
+        cls.recipes = []
+        for index in range(12):
+            recipe = Recipe.objects.create(
+                name=f'Рецепт {index}',
+                text='Описание',
+                cooking_time=10 + index,
+                author=cls.users[1 + index % 3]
+            )
+            RecipeTag.objects.create(
+                recipe=recipe, tag=cls.tags[index % 3]
+            )
+            RecipeTag.objects.create(
+                recipe=recipe, tag=cls.tags[(index + 1) % 3]
+            )
+            for offset in range(3):
+                RecipeIngredient.objects.create(
+                    recipe=recipe,
+                    ingredient=cls.ingredients[(index + offset) % 10],
+                    amount=offset + 1
+                )
+            cls.recipes.append(recipe)
+        for author in cls.users[1:]:
+            Follow.objects.create(user=cls.user, author=author)
+        for recipe in cls.recipes[:5]:
+            RecipeFavorites.objects.create(user=cls.user, recipe=recipe)
+            RecipeCart.objects.create(user=cls.user, recipe=recipe)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+
+class QueryBudgetTest(FoodgramDataMixin, QueryBudgetMixin, APITestCase):
+
+    def test_recipe_list(self):
+        response = self.assertQueryBudget('/api/recipes/?page=1&limit=6')
+        self.assertEqual(len(response.data['results']), 6)
+
+    def test_recipe_list_filtered(self):
+        response = self.assertQueryBudget(
+            '/api/recipes/?page=1&limit=6&is_favorited=1&tags=lunch',
+            # фильтр по тегам проверяет slug отдельным запросом
+            budget=self.query_budgets['/api/recipes/'] + 1
+        )
+        self.assertTrue(response.data['results'])
+
+    def test_subscriptions(self):
+        response = self.assertQueryBudget(
+            '/api/users/subscriptions/?recipes_limit=2'
+        )
+        self.assertEqual(len(response.data), 3)
+        self.assertTrue(all(
+            len(author['recipes']) == 2 for author in response.data
+        ))
+
+    def test_subscriptions_paginated(self):
+        response = self.assertQueryBudget(
+            '/api/users/subscriptions/?page=1&limit=2&recipes_limit=2'
+        )
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_download_cart(self):
+        response = self.assertQueryBudget(
+            '/api/recipes/download_shopping_cart/'
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+class FastPathParityTest(FoodgramDataMixin, FastPathParityMixin,
+                         APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Recipe.objects.filter(pk=cls.recipes[0].pk).update(
+            image='recipe/first.png',
+            image_renditions={
+                'source': 'recipe/first.png',
+                'small': 'recipe/renditions/first_small.webp',
+                'medium': 'recipe/renditions/first_medium.webp',
+            }
+        )
+        Recipe.objects.filter(pk=cls.recipes[1].pk).update(
+            image='recipe/second.png',
+            image_renditions={
+                'source': 'recipe/old.png',
+                'small': 'recipe/renditions/old_small.webp',
+            }
+        )
+        Recipe.objects.filter(pk=cls.recipes[2].pk).update(
+            image='recipe/third.png'
+        )
+
+    def assertSameContent(self, response, expected):
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.content,
+            response.accepted_renderer.render(expected)
+        )
+
+    def previews(self, author, limit=None):
+        recipes = Recipe.objects.filter(author=author).order_by('id')
+        if limit:
+            recipes = recipes[:limit]
+        return ShortRecipeSerializer(recipes, many=True).data
+
+    def test_fast_path_cases(self):
+        self.assertFastPathParity()
+
+    def test_tags(self):
+        self.assertSameContent(
+            self.client.get('/api/tags/'),
+            TagSerializer(Tag.objects.all(), many=True).data
+        )
+
+    def test_ingredients(self):
+        self.assertSameContent(
+            self.client.get('/api/ingredients/'),
+            IngredientSerializer(Ingredient.objects.all(), many=True).data
+        )
+
+    def test_subscription_previews(self):
+        for url, limit in (
+            ('/api/users/subscriptions/', None),
+            ('/api/users/subscriptions/?recipes_limit=2', 2),
+        ):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data), 3)
+            for author in response.data:
+                self.assertEqual(
+                    self.renderer(response).render(author['recipes']),
+                    self.renderer(response).render(
+                        self.previews(author['id'], limit)
+                    )
+                )
+
+    def test_subscribe_preview(self):
+        self.client.force_authenticate(self.users[3])
+        response = self.client.post(
+            f'/api/users/{self.users[1].id}/subscribe/?recipes_limit=3'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            self.renderer(response).render(response.data['recipes']),
+            self.renderer(response).render(self.previews(self.users[1], 3))
+        )
+
+    def renderer(self, response):
+        return response.accepted_renderer
+
+
+class ReplicaRouterTest(APITransactionTestCase):
+    # Зеркало видит только закоммиченные данные, поэтому тест без обертки
+    # в транзакцию.
+    databases = {routers.PRIMARY, REPLICA}
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='reader', email='reader@foodgram.ru', password='pass'
+        )
+        self.recipe = Recipe.objects.create(
+            name='Рецепт', text='Описание', cooking_time=10, author=self.user
+        )
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        for name in ('REPLICAS', 'DB_REPLICAS'):
+            patcher = mock.patch.object(routers, name, [REPLICA])
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def get(self, url):
+        with CaptureQueriesContext(
+            connections[routers.PRIMARY]
+        ) as primary, CaptureQueriesContext(connections[REPLICA]) as replica:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return primary.captured_queries, replica.captured_queries
+
+    def test_reads_use_replica(self):
+        primary, replica = self.get('/api/recipes/?page=1&limit=6')
+        self.assertTrue(replica)
+        self.assertFalse(any(
+            'recipe_recipe' in query['sql'] for query in primary
+        ))
+
+    def test_token_read_from_primary(self):
+        primary, replica = self.get('/api/recipes/?page=1&limit=6')
+        self.assertTrue(any(
+            'authtoken_token' in query['sql'] for query in primary
+        ))
+        self.assertFalse(any(
+            'authtoken_token' in query['sql'] for query in replica
+        ))
+
+    def test_sticky_after_write(self):
+        response = self.client.post(
+            f'/api/recipes/{self.recipe.id}/favorite/'
+        )
+        self.assertEqual(response.status_code, 201)
+        primary, replica = self.get('/api/recipes/?page=1&limit=6')
+        self.assertFalse(replica)
+        self.assertTrue(primary)
+
+    def test_writes_during_get_use_primary(self):
+        routers.use_replicas(True)
+        self.addCleanup(routers.use_replicas, False)
+        with CaptureQueriesContext(
+            connections[routers.PRIMARY]
+        ) as primary, CaptureQueriesContext(connections[REPLICA]) as replica:
+            LastModified.touch('recipe')
+        self.assertFalse(replica)
+        self.assertTrue(any(
+            query['sql'].startswith('UPDATE') for query in primary
+        ))
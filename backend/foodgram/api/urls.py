@@ -1,8 +1,9 @@
 from django.urls import include, path
 from rest_framework import routers
 
-from .views import (FollowViewSet, IngredientViewSet, RecipeViewSet,
-                    TagViewSet, cart_favorite_view, download_cart, follow_view)
+from .views import (CustomUserViewSet, FollowViewSet, IngredientViewSet,
+                    RecipeViewSet, TagViewSet, bulk_relation_view,
+                    cart_favorite_view, download_cart, follow_view)
 
 router = routers.DefaultRouter()
 router.register(r'tags', TagViewSet, basename='tags')
@@ -13,9 +14,28 @@ router.register(
     basename='subscriptions'
 )
 router.register(r'recipes', RecipeViewSet, basename='recipes')
+router.register(r'users', CustomUserViewSet, basename='users')
 
 urlpatterns = [
     path('users/<int:pk>/subscribe/', follow_view, name='modify_subs'),
+    path(
+        'users/subscribe/',
+        bulk_relation_view,
+        {'relation': 'subscribe'},
+        name='bulk_subs'
+    ),
+    path(
+        'recipes/favorite/',
+        bulk_relation_view,
+        {'relation': 'favorite'},
+        name='bulk_favs'
+    ),
+    path(
+        'recipes/shopping_cart/',
+        bulk_relation_view,
+        {'relation': 'shopping_cart'},
+        name='bulk_cart'
+    ),
     path('recipes/<int:pk>/favorite/', cart_favorite_view, name='modify_favs'),
     path(
         'recipes/<int:pk>/shopping_cart/',
@@ -28,6 +48,5 @@ urlpatterns = [
         name='download_cart'
     ),
     path('', include(router.urls)),
-    path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
 ]
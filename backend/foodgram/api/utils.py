@@ -1,5 +1,66 @@
+import csv
+import json
+from itertools import islice
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
 from rest_framework_csv.renderers import CSVRenderer
 
+CART_FIELDS = ['name', 'sum', 'measurement_unit']
+CART_STREAM_ROWS = 500
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def chunked(lines, size=CART_STREAM_ROWS):
+    lines = iter(lines)
+    while True:
+        chunk = ''.join(islice(lines, size))
+        if not chunk:
+            return
+        yield chunk.encode('utf-8')
+
 
 class CartRender(CSVRenderer):
-    header = ['name', 'sum', 'measurement_unit']
+    header = CART_FIELDS
+
+    def stream(self, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow(self.header)
+        for row in rows:
+            yield writer.writerow([row[field] for field in self.header])
+
+
+class CartTextRender(BaseRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            return '\n'.join(
+                f'{key}: {value}' for key, value in data.items()
+            ).encode(self.charset)
+        return ''.join(self.stream(data)).encode(self.charset)
+
+    def stream(self, rows):
+        for row in rows:
+            yield (
+                f"{row['name']} ({row['measurement_unit']}) — "
+                f"{row['sum']}\n"
+            )
+
+
+class CartJSONRender(JSONRenderer):
+
+    def stream(self, rows):
+        separator = '['
+        for row in rows:
+            yield separator + json.dumps(
+                {field: row[field] for field in CART_FIELDS},
+                ensure_ascii=False
+            )
+            separator = ','
+        yield ']' if separator == ',' else '[]'
@@ -1,37 +1,78 @@
-from django.db.models import F, Sum
-from django.http import HttpResponse
+from functools import partial
+
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.urls import resolve
-from recipe.models import (Follow, Ingredient, Recipe, RecipeCart,
-                           RecipeFavorites, RecipeIngredient, Tag, User)
-from rest_framework import status, viewsets
-from rest_framework.decorators import api_view, renderer_classes
+from djoser.views import UserViewSet
+from recipe.counters import delete_with_counters
+from recipe.feed import INBOX_ENABLED, INBOX_ORDERING, get_feed
+from recipe.models import (Follow, Ingredient, LastModified, Recipe,
+                           RecipeCart, RecipeFavorites, RecipeIngredient, Tag,
+                           User)
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action, api_view, renderer_classes
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from .filters import IngredientFilter, RecipeFilter
-from .mixins import ListViewSet
+from .bulk import bulk_add, bulk_remove
+from .fast import ingredient_rows, tag_rows
+from .filters import RECIPE_ORDERINGS, IngredientFilter, RecipeFilter
+from .indexes import ingredient_index
+from .mixins import (CachedRetrieveListMixin, ConditionalGetMixin,
+                     CursorPaginationMixin, ListViewSet)
 from .permissions import IsAdminOrReadOnly, IsOwnerOrReadOnly
-from .serializers import (CartSerializer, FavoriteSerializer, FollowSerializer,
+from .serializers import (BulkIdsSerializer, CartSerializer,
+                          FavoriteSerializer, FollowSerializer,
                           FollowUserSerializer, IngredientSerializer,
                           RecipeSerializer, ShortRecipeSerializer,
-                          TagSerializer)
-from .utils import CartRender
+                          TagSerializer, requested_fields)
+from .utils import (CART_STREAM_ROWS, CartJSONRender, CartRender,
+                    CartTextRender, chunked)
 
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
     permission_classes = [IsAdminOrReadOnly]
 
+    def get_last_modified(self, request, *args, **kwargs):
+        return LastModified.get('tag')
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(self.rows, request)
+
+    def rows(self, request):
+        return Response(tag_rows(self.filter_queryset(self.get_queryset())))
 
-class IngredientViewSet(viewsets.ModelViewSet):
+
+class IngredientViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     pagination_class = None
     permission_classes = [IsAdminOrReadOnly]
     filterset_class = IngredientFilter
 
+    def get_last_modified(self, request, *args, **kwargs):
+        return ingredient_index.get_last_modified()
+
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if not name:
+            return self.conditional_response(self.rows, request)
+        return self.conditional_response(self.search, request, name)
+
+    def rows(self, request):
+        return Response(
+            ingredient_rows(self.filter_queryset(self.get_queryset()))
+        )
+
+    def search(self, request, name):
+        return Response(ingredient_index.search(name))
+
 
 @api_view(['POST', 'DELETE'])
 def follow_view(request, pk):
@@ -64,14 +105,37 @@ def follow_view(request, pk):
     return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class FollowViewSet(ListViewSet):
+@api_view(['POST', 'DELETE'])
+def bulk_relation_view(request, relation):
+    serializer = BulkIdsSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    ids = serializer.validated_data['ids']
+    if request.method == 'POST':
+        excluded = {request.user.id} if relation == 'subscribe' else set()
+        results = bulk_add(relation, request.user, ids, excluded)
+    else:
+        results = bulk_remove(relation, request.user, ids)
+    return Response({'results': results})
+
+
+class CustomUserViewSet(UserViewSet):
+
+    def perform_destroy(self, instance):
+        delete_with_counters(User.objects.filter(pk=instance.pk))
+
+
+class FollowViewSet(CursorPaginationMixin, ListViewSet):
     serializer_class = FollowUserSerializer
+    cursor_ordering = ('-id',)
 
     def get_queryset(self):
         following_users = Follow.objects.filter(
             user=self.request.user
         ).values_list('author')
-        return User.objects.filter(id__in=following_users)
+        return User.objects.filter(id__in=following_users).annotate(
+            recipes_count=Coalesce('stats__recipes_count', 0),
+            is_subscribed=Value(True)
+        )
 
 
 @api_view(['POST', 'DELETE'])
@@ -119,7 +183,7 @@ def cart_favorite_view(request, pk):
 
 
 @api_view(['GET'])
-@renderer_classes([CartRender])
+@renderer_classes([CartRender, CartTextRender, CartJSONRender])
 def download_cart(request):
     recipes_in_cart = RecipeCart.objects.filter(
         user=request.user
@@ -127,29 +191,99 @@ def download_cart(request):
     ingredients = RecipeIngredient.objects.filter(
         recipe__in=recipes_in_cart
     ).values(
-        'ingredient__name',
-        'ingredient__measurement_unit'
-    ).annotate(
         name=F('ingredient__name'),
-        measurement_unit=F('ingredient__measurement_unit'),
-        all_amt=Sum('amount')
+        measurement_unit=F('ingredient__measurement_unit')
+    ).annotate(
+        sum=Sum('amount')
+    ).order_by('name', 'measurement_unit')
+    renderer = request.accepted_renderer
+    response = StreamingHttpResponse(
+        chunked(renderer.stream(
+            ingredients.iterator(chunk_size=CART_STREAM_ROWS)
+        )),
+        content_type=f'{renderer.media_type}; charset=utf-8'
     )
-    content = [{
-        'name': ingredient['name'],
-        'sum': ingredient['all_amt'],
-        'measurement_unit': ingredient['measurement_unit']
-    } for ingredient in ingredients]
-    response = HttpResponse(
-        request.accepted_renderer.render(content),
-        content_type="text/csv"
+    response['Content-Disposition'] = (
+        f'attachment; filename="cart.{renderer.format}"'
     )
-    response['Content-Disposition'] = 'attachment; filename="cart.csv"'
     return response
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
-    queryset = Recipe.objects.all()
+class RecipeViewSet(
+    ConditionalGetMixin,
+    CachedRetrieveListMixin,
+    CursorPaginationMixin,
+    viewsets.ModelViewSet
+):
     serializer_class = RecipeSerializer
     http_method_names = ['get', 'post', 'patch', 'delete']
     permission_classes = [IsOwnerOrReadOnly]
     filterset_class = RecipeFilter
+
+    def get_queryset(self):
+        user = self.request.user
+        if self.action == 'feed':
+            recipes = get_feed(user)
+        else:
+            recipes = Recipe.objects.all()
+        fields = requested_fields(
+            self.request,
+            RecipeSerializer.Meta.fields,
+            RecipeSerializer.compact_fields
+        )
+        return recipes.with_related(user, fields).with_user_flags(
+            user, fields
+        ).defer_omitted(fields)
+
+    @action(detail=False, permission_classes=[IsAuthenticated])
+    def feed(self, request):
+        return self.conditional_response(
+            partial(mixins.ListModelMixin.list, self), request
+        )
+
+    def perform_create(self, serializer):
+        serializer.save()
+        serializer.instance = self.get_queryset().get(
+            pk=serializer.instance.pk
+        )
+
+    def perform_update(self, serializer):
+        serializer.save()
+        serializer.instance = self.get_queryset().get(
+            pk=serializer.instance.pk
+        )
+
+    def perform_destroy(self, instance):
+        delete_with_counters(Recipe.objects.filter(pk=instance.pk))
+
+    def get_cursor_ordering(self, request):
+        if request.query_params.get('ordering') in RECIPE_ORDERINGS:
+            # Счетчики меняются и часто совпадают: курсор по ним пропускал
+            # бы и повторял рецепты, поэтому такие сортировки постраничные.
+            raise ValidationError({
+                'pagination': [
+                    'Курсорная пагинация недоступна для этой сортировки'
+                ]
+            })
+        if self.action == 'feed' and INBOX_ENABLED:
+            return INBOX_ORDERING
+        return Recipe._meta.ordering
+
+    def get_last_modified(self, request, *args, **kwargs):
+        ordering = request.query_params.get('ordering')
+        keys = ['tag', 'ingredient', 'author']
+        if ordering in ('popular', 'trending'):
+            keys.append(ordering)
+        if request.user.is_authenticated:
+            keys.append(f'user:{request.user.id}')
+        if 'pk' not in kwargs:
+            return LastModified.get('recipe', *keys)
+        updated_at = Recipe.objects.filter(pk=kwargs['pk']).values_list(
+            'updated_at', flat=True
+        ).first()
+        if updated_at is None:
+            return None
+        last_modified = LastModified.get(*keys)
+        if last_modified is None:
+            return updated_at
+        return max(updated_at, last_modified)
@@ -28,6 +28,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.QueryInstrumentationMiddleware',
+    'api.routers.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -65,10 +67,37 @@ DATABASES = {
         'USER': os.environ.get('POSTGRES_USER', default='secret'),
         'PASSWORD': os.environ.get('POSTGRES_PASSWORD', default='secret'),
         'HOST': os.environ.get('DB_HOST', default='db'),
-        'PORT': os.environ.get('DB_PORT', default='5432')
+        'PORT': os.environ.get('DB_PORT', default='5432'),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', default=60)),
+        'CONN_HEALTH_CHECKS': os.environ.get('DB_CONN_HEALTH_CHECKS', default='True') == 'True',
+        # pgbouncer в режиме transaction не сохраняет серверные курсоры между транзакциями
+        'DISABLE_SERVER_SIDE_CURSORS': os.environ.get('DB_POOL_MODE') == 'transaction',
     }
 }
 
+# Реплики для чтения через запятую: host[:port] для PostgreSQL, путь к файлу для SQLite
+DB_REPLICAS = [replica for replica in os.environ.get('DB_REPLICAS', default='').split(',') if replica]
+for number, replica in enumerate(DB_REPLICAS, start=1):
+    if DATABASES['default']['ENGINE'].endswith('sqlite3'):
+        location = {'NAME': replica}
+    else:
+        host, _, port = replica.partition(':')
+        location = {'HOST': host, 'PORT': port or DATABASES['default']['PORT']}
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        **location,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['api.routers.ReplicaRouter']
+# Сколько секунд после записи запросы пользователя читают с основной БД
+DB_REPLICA_STICKY_SECONDS = 5
+
+DB_CONN_HEALTH_CHECKS = DATABASES['default']['CONN_HEALTH_CHECKS']
+# Путь к функции, получающей метрики соединений по каждому запросу,
+# например api.connections.log_metrics
+DB_METRICS_HOOK = os.environ.get('DB_METRICS_HOOK')
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME':
@@ -104,7 +133,7 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'backend_media')
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
 
     ),
     'DEFAULT_PAGINATION_CLASS':
@@ -117,13 +146,98 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Рендеринг и разбор JSON через orjson, если он установлен
+FAST_JSON = os.environ.get('FAST_JSON', default='True') == 'True'
+if FAST_JSON:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ]
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'] = [
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ]
+
 EXC_NAME = 'me'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Покрывающие индексы (INCLUDE) создаются только на PostgreSQL,
+# на других СУБД они строятся без неключевых столбцов
+SILENCED_SYSTEM_CHECKS = ['models.W040']
+
 MIN_COOKING_TIME = 1
 MIN_INGREDIENT_AMOUNT = 1
 
+INGREDIENT_SEARCH_LIMIT = 50
+INGREDIENT_INDEX_TTL = 300
+
+CURSOR_PAGE_SIZE = 6
+# exact, estimate (оценка планировщика PostgreSQL) или none
+CURSOR_COUNT_MODE = 'estimate'
+
+RECIPE_CACHE_TIMEOUT = 60 * 10
+
+RECIPE_IMAGE_RENDITIONS = {'small': 320, 'medium': 640, 'large': 1280}
+RECIPE_IMAGE_FORMAT = 'WEBP'
+RECIPE_IMAGE_QUALITY = 80
+RECIPE_IMAGE_ASYNC = True
+RECIPE_IMAGE_WORKERS = 2
+
+TRENDING_HALF_LIFE_HOURS = 48
+TRENDING_WINDOW_HALF_LIVES = 10
+TRENDING_FAVORITE_WEIGHT = 1.0
+TRENDING_CART_WEIGHT = 0.5
+TRENDING_MIN_SCORE = 0.01
+
+BULK_MAX_IDS = 100
+
+# Лента подписок: read - выборка по подпискам при чтении,
+# inbox - материализованная лента, заполняемая при публикации рецепта
+FEED_STRATEGY = os.environ.get('FEED_STRATEGY', default='read')
+FEED_INBOX_BACKFILL = 50
+FEED_FANOUT_BATCH_SIZE = 1000
+
+# Конфигурация полнотекстового поиска PostgreSQL
+SEARCH_CONFIG = 'russian'
+
+TOKEN_CACHE_TIMEOUT = 60 * 5
+
+# Кеш должен быть общим для всех воркеров, иначе сброс кеша рецептов и отзыв
+# токенов видны только в одном процессе
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default=''),
+    }
+}
+# Кеш токенов работает только с общим бэкендом: в памяти процесса отзыв
+# токена был бы виден лишь одному воркеру до истечения TOKEN_CACHE_TIMEOUT
+TOKEN_CACHE_ENABLED = CACHES['default']['BACKEND'] not in (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+# Server-Timing и лог запросов к БД по каждому HTTP-запросу
+QUERY_INSTRUMENTATION = os.getenv('QUERY_INSTRUMENTATION', 'False') == 'True'
+# Замер времени сериализации подменяет BaseSerializer.data во всем процессе
+SERIALIZER_TIMING = os.getenv('SERIALIZER_TIMING', 'False') == 'True'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api.middleware': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
+
 DJOSER = {
     'SERIALIZERS': {
         'user': 'api.serializers.CustomUserSerializer',
@@ -1,11 +1,20 @@
 from django.contrib import admin
-from django.db.models import Count
 
+from .counters import delete_with_counters
 from .models import (Follow, Ingredient, Recipe, RecipeCart, RecipeFavorites,
-                     RecipeIngredient, RecipeTag, Tag, User)
+                     RecipeIngredient, RecipeTag, Tag, User, UserStats)
 
 
-class UserAdmin(admin.ModelAdmin):
+class CountedDeleteMixin:
+
+    def delete_model(self, request, obj):
+        delete_with_counters(self.model.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        delete_with_counters(queryset)
+
+
+class UserAdmin(CountedDeleteMixin, admin.ModelAdmin):
 
     list_filter = [
         'username', 'email', 'last_name', 'first_name'
@@ -15,17 +24,17 @@ class UserAdmin(admin.ModelAdmin):
     ]
 
 
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(CountedDeleteMixin, admin.ModelAdmin):
     list_filter = ['name', 'author', 'tags']
-    list_display = ['name', 'author', 'is_favorite_count']
+    list_display = ['name', 'author', 'favorites_count', 'cart_count']
+    list_select_related = ['author']
+    readonly_fields = ['favorites_count', 'cart_count']
 
-    def get_queryset(self, request):
-        qs = super(RecipeAdmin, self).get_queryset(request)
-        return qs.annotate(user_favorites_cnt=Count('user_favorites'))
 
-    def is_favorite_count(self, inst):
-        return inst.user_favorites_cnt
-    is_favorite_count.admin_order_field = 'user_favorites_cnt'
+class UserStatsAdmin(admin.ModelAdmin):
+    list_display = ['user', 'recipes_count', 'followers_count']
+    list_select_related = ['user']
+    readonly_fields = ['recipes_count', 'followers_count']
 
 
 class IngredientAdmin(admin.ModelAdmin):
@@ -42,3 +51,4 @@ admin.site.register(RecipeTag)
 admin.site.register(Follow)
 admin.site.register(RecipeFavorites)
 admin.site.register(RecipeCart)
+admin.site.register(UserStats, UserStatsAdmin)
@@ -0,0 +1,107 @@
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import (Follow, Recipe, RecipeCart, RecipeFavorites, User,
+                     UserStats)
+
+STATS_BATCH_SIZE = 1000
+
+_state = threading.local()
+
+
+@contextmanager
+def bulk_changes():
+    # Массовые операции сами обновляют счетчики и ленты один раз на пачку,
+    # обработчики post_save/post_delete по отдельным строкам в это время
+    # пропускают работу.
+    _state.bulk = getattr(_state, 'bulk', 0) + 1
+    try:
+        yield
+    finally:
+        _state.bulk -= 1
+
+
+def in_bulk_changes():
+    return getattr(_state, 'bulk', 0) > 0
+
+
+def change_recipe_counter(field, recipe_ids, delta):
+    Recipe.objects.filter(pk__in=recipe_ids).update(
+        **{field: Greatest(F(field) + delta, Value(0))}
+    )
+
+
+def change_user_counter(field, user_ids, delta):
+    user_ids = set(user_ids)
+    updated = UserStats.objects.filter(user__in=user_ids).update(
+        **{field: Greatest(F(field) + delta, Value(0))}
+    )
+    # При уменьшении счетчика строки может не быть, потому что автор сам
+    # удаляется каскадом: пересчет воссоздал бы ее для удаленного
+    # пользователя.
+    if updated != len(user_ids) and delta > 0:
+        recount_users(User.objects.filter(pk__in=user_ids))
+
+
+def count_subquery(model, field, outer_field='pk'):
+    return Coalesce(Subquery(
+        model.objects.filter(
+            **{field: OuterRef(outer_field)}
+        ).order_by().values(field).annotate(
+            total=Count('*')
+        ).values('total')
+    ), 0)
+
+
+def recount_recipes(recipes=None):
+    if recipes is None:
+        recipes = Recipe.objects.all()
+    return recipes.update(
+        favorites_count=count_subquery(RecipeFavorites, 'recipe'),
+        cart_count=count_subquery(RecipeCart, 'recipe')
+    )
+
+
+def recount_users(users=None):
+    if users is None:
+        users = User.objects.all()
+    UserStats.objects.bulk_create(
+        (UserStats(user_id=user_id) for user_id in users.filter(
+            stats__isnull=True
+        ).values_list('pk', flat=True)),
+        batch_size=STATS_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+    return UserStats.objects.filter(user__in=users.values('pk')).update(
+        recipes_count=count_subquery(Recipe, 'author', 'user'),
+        followers_count=count_subquery(Follow, 'author', 'user')
+    )
+
+
+def delete_with_counters(queryset):
+    # Каскад по избранному, корзинам и подпискам иначе обновлял бы счетчики
+    # отдельным запросом на каждую удаляемую строку.
+    with transaction.atomic(), bulk_changes():
+        if queryset.model is User:
+            recipe_ids = set(RecipeFavorites.objects.filter(
+                user__in=queryset
+            ).values_list('recipe_id', flat=True))
+            recipe_ids.update(RecipeCart.objects.filter(
+                user__in=queryset
+            ).values_list('recipe_id', flat=True))
+            user_ids = set(Follow.objects.filter(
+                user__in=queryset
+            ).values_list('author_id', flat=True))
+        else:
+            recipe_ids = set()
+            user_ids = set(queryset.values_list('author_id', flat=True))
+        deleted = queryset.delete()
+        if recipe_ids:
+            recount_recipes(Recipe.objects.filter(pk__in=recipe_ids))
+        if user_ids:
+            recount_users(User.objects.filter(pk__in=user_ids))
+    return deleted
@@ -0,0 +1,77 @@
+from itertools import islice
+
+from django.db.models import F
+from foodgram.settings import (FEED_FANOUT_BATCH_SIZE, FEED_INBOX_BACKFILL,
+                               FEED_STRATEGY)
+
+from .models import FeedItem, Follow, Recipe
+
+INBOX_ENABLED = FEED_STRATEGY == 'inbox'
+FEED_ORDERING = ('-pub_date', '-id')
+INBOX_ORDERING = ('-feed_pub_date', '-id')
+
+
+def get_feed(user, strategy=FEED_STRATEGY):
+    if strategy == 'inbox':
+        return Recipe.objects.filter(feed_items__user=user).annotate(
+            feed_pub_date=F('feed_items__pub_date')
+        ).order_by(*INBOX_ORDERING)
+    return Recipe.objects.filter(
+        author__in=Follow.objects.filter(user=user).values('author')
+    ).order_by(*FEED_ORDERING)
+
+
+def bulk_create_items(items):
+    items = iter(items)
+    while True:
+        batch = list(islice(items, FEED_FANOUT_BATCH_SIZE))
+        if not batch:
+            return
+        FeedItem.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def fan_out(recipe_id, author_id, pub_date):
+    followers = Follow.objects.filter(author=author_id).values_list(
+        'user_id', flat=True
+    )
+    bulk_create_items(
+        FeedItem(user_id=user_id, recipe_id=recipe_id, pub_date=pub_date)
+        for user_id in followers.iterator()
+    )
+
+
+def add_authors(user_id, author_ids):
+    recipes = Recipe.objects.filter(author__in=author_ids).limit_per_author(
+        FEED_INBOX_BACKFILL, FEED_ORDERING
+    ).values_list('pk', 'pub_date')
+    bulk_create_items(
+        FeedItem(user_id=user_id, recipe_id=recipe_id, pub_date=pub_date)
+        for recipe_id, pub_date in recipes.iterator()
+    )
+
+
+def remove_authors(user_id, author_ids):
+    FeedItem.objects.filter(
+        user_id=user_id, recipe__author__in=author_ids
+    ).delete()
+
+
+def rebuild_inbox(users=None):
+    follows = Follow.objects.order_by('user_id', 'author_id')
+    if users is not None:
+        follows = follows.filter(user__in=users)
+        FeedItem.objects.filter(user__in=users).delete()
+    else:
+        FeedItem.objects.all().delete()
+    current_user = None
+    author_ids = []
+    for user_id, author_id in follows.values_list(
+        'user_id', 'author_id'
+    ).iterator():
+        if user_id != current_user and author_ids:
+            add_authors(current_user, author_ids)
+            author_ids = []
+        current_user = user_id
+        author_ids.append(author_id)
+    if author_ids:
+        add_authors(current_user, author_ids)
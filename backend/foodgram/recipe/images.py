@@ -0,0 +1,118 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.db import connections
+from foodgram.settings import (RECIPE_IMAGE_ASYNC, RECIPE_IMAGE_FORMAT,
+                               RECIPE_IMAGE_QUALITY, RECIPE_IMAGE_RENDITIONS,
+                               RECIPE_IMAGE_WORKERS)
+from PIL import Image, ImageOps, features
+
+from .models import Recipe
+
+logger = logging.getLogger(__name__)
+
+RENDITIONS_DIR = 'recipe/renditions'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=RECIPE_IMAGE_WORKERS,
+                thread_name_prefix='recipe-images'
+            )
+        return _executor
+
+
+def get_image_format():
+    if RECIPE_IMAGE_FORMAT == 'WEBP' and not features.check('webp'):
+        return 'JPEG'
+    return RECIPE_IMAGE_FORMAT
+
+
+def needs_renditions(recipe):
+    return (
+        bool(recipe.image)
+        and recipe.image_renditions.get('source') != recipe.image.name
+    )
+
+
+def build_renditions(image):
+    image_format = get_image_format()
+    extension = 'jpg' if image_format == 'JPEG' else image_format.lower()
+    stem = os.path.splitext(os.path.basename(image.name))[0]
+    storage = image.storage
+    renditions = {'source': image.name}
+    with image.open('rb'), Image.open(image) as source:
+        source = ImageOps.exif_transpose(source)
+        if image_format == 'JPEG' or source.mode not in ('RGB', 'RGBA'):
+            source = source.convert('RGB')
+        for size_name, width in RECIPE_IMAGE_RENDITIONS.items():
+            rendition = source.copy()
+            rendition.thumbnail((width, width), Image.LANCZOS)
+            buffer = BytesIO()
+            rendition.save(
+                buffer,
+                format=image_format,
+                quality=RECIPE_IMAGE_QUALITY
+            )
+            name = f'{RENDITIONS_DIR}/{stem}_{size_name}.{extension}'
+            if storage.exists(name):
+                storage.delete(name)
+            renditions[size_name] = storage.save(
+                name, ContentFile(buffer.getvalue())
+            )
+    return renditions
+
+
+def delete_renditions(storage, renditions, keep=()):
+    for size_name, name in renditions.items():
+        if size_name != 'source' and name not in keep:
+            storage.delete(name)
+
+
+def process_recipe_image(recipe_id, force=False):
+    recipe = Recipe.objects.filter(pk=recipe_id).first()
+    if recipe is None or not recipe.image:
+        return False
+    if not force and not needs_renditions(recipe):
+        return False
+    previous = recipe.image_renditions
+    recipe.image_renditions = build_renditions(recipe.image)
+    if not Recipe.objects.filter(
+        pk=recipe_id, image=recipe.image.name
+    ).exists():
+        return False
+    recipe.save(update_fields=['image_renditions', 'updated_at'])
+    delete_renditions(
+        recipe.image.storage,
+        previous,
+        keep=recipe.image_renditions.values()
+    )
+    return True
+
+
+def _run(recipe_id):
+    try:
+        process_recipe_image(recipe_id)
+    except Exception:
+        logger.exception(
+            'Не удалось обработать картинку рецепта %s', recipe_id
+        )
+    finally:
+        connections.close_all()
+
+
+def schedule_renditions(recipe_id):
+    if RECIPE_IMAGE_ASYNC:
+        get_executor().submit(_run, recipe_id)
+    else:
+        process_recipe_image(recipe_id)
@@ -0,0 +1,65 @@
+import time
+
+from api.testing import fast_path_cases
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import Client
+from recipe.models import User
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+
+
+def cpu_seconds(call, iterations):
+    started = time.process_time()
+    for _ in range(iterations):
+        call()
+    return max(time.process_time() - started, 1e-9)
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверка совпадения быстрых представлений с сериализаторами и '
+        'замер пропускной способности на одно ядро'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        if iterations < 1:
+            raise CommandError('Число итераций должно быть положительным')
+        renderer = JSONRenderer()
+        for name, (serializer_call, fast_call) in fast_path_cases().items():
+            expected = renderer.render(serializer_call())
+            if renderer.render(fast_call()) != expected:
+                raise CommandError(f'{name}: ответы различаются')
+            rows = len(fast_call())
+            serializer_rate = rows * iterations / cpu_seconds(
+                serializer_call, iterations
+            )
+            fast_rate = rows * iterations / cpu_seconds(fast_call, iterations)
+            self.stdout.write(
+                f'{name:<16} строк: {rows}, сериализатор '
+                f'{serializer_rate:,.0f} строк/с, быстрый путь '
+                f'{fast_rate:,.0f} строк/с, ускорение '
+                f'x{fast_rate / max(serializer_rate, 1e-9):.1f}'
+            )
+        user = User.objects.annotate(
+            follows=Count('follower')
+        ).order_by('-follows', 'pk').first()
+        if user is None:
+            return
+        token, _ = Token.objects.get_or_create(user=user)
+        client = Client(HTTP_AUTHORIZATION=f'Token {token.key}')
+        for url in (
+            '/api/tags/',
+            '/api/ingredients/',
+            '/api/users/subscriptions/?recipes_limit=3',
+        ):
+            if client.get(url).status_code != 200:
+                raise CommandError(f'{url}: неожиданный статус ответа')
+            rate = iterations / cpu_seconds(
+                lambda: client.get(url), iterations
+            )
+            self.stdout.write(f'{url:<45} {rate:,.1f} запросов/с на ядро')
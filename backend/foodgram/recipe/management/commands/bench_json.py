@@ -0,0 +1,87 @@
+import io
+import time
+
+from api.parsers import FastJSONParser
+from api.renderers import FastJSONRenderer, orjson
+from api.serializers import RecipeSerializer
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from foodgram.settings import CURSOR_PAGE_SIZE
+from recipe.models import Recipe, User
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from .run_benchmark import percentile
+
+
+class Command(BaseCommand):
+    help = 'Сравнение скорости рендеринга и разбора JSON для списка рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--size', type=int, default=CURSOR_PAGE_SIZE)
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1 or options['size'] < 1:
+            raise CommandError('Параметры должны быть положительными')
+        if orjson is None:
+            self.stdout.write(
+                'orjson не установлен, быстрые классы используют stdlib'
+            )
+        data = self.page(options['size'])
+        if not data:
+            raise CommandError('Нет рецептов для сериализации')
+        stdlib_body = JSONRenderer().render(data)
+        fast_body = FastJSONRenderer().render(data)
+        if JSONParser().parse(io.BytesIO(fast_body)) != JSONParser().parse(
+            io.BytesIO(stdlib_body)
+        ):
+            raise CommandError('Результаты рендеринга различаются')
+        self.stdout.write(
+            f'Рецептов: {len(data)}, размер ответа: {len(stdlib_body)} байт'
+        )
+        cases = {
+            'render': (
+                lambda: JSONRenderer().render(data),
+                lambda: FastJSONRenderer().render(data),
+            ),
+            'parse': (
+                lambda: JSONParser().parse(io.BytesIO(stdlib_body)),
+                lambda: FastJSONParser().parse(io.BytesIO(stdlib_body)),
+            ),
+        }
+        for name, (stdlib_call, fast_call) in cases.items():
+            stdlib = self.measure(stdlib_call, options['iterations'])
+            fast = self.measure(fast_call, options['iterations'])
+            self.stdout.write(
+                f'{name}: stdlib p50 {stdlib["p50"]:.3f} мс, '
+                f'p95 {stdlib["p95"]:.3f} мс; '
+                f'fast p50 {fast["p50"]:.3f} мс, p95 {fast["p95"]:.3f} мс; '
+                f'ускорение x{stdlib["p50"] / max(fast["p50"], 1e-6):.1f}'
+            )
+
+    def page(self, size):
+        user = User.objects.order_by('pk').first() or AnonymousUser()
+        request = Request(APIRequestFactory().get('/api/recipes/'))
+        request.user = user
+        # Тот же запрос, что и в RecipeViewSet, чтобы сериализация не
+        # добирала связанные объекты отдельными запросами
+        queryset = Recipe.objects.with_related(user).with_user_flags(user)
+        return RecipeSerializer(
+            queryset[:size],
+            many=True,
+            context={'request': request}
+        ).data
+
+    def measure(self, call, iterations):
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            call()
+            timings.append((time.perf_counter() - started) * 1000)
+        return {
+            'p50': percentile(timings, 50),
+            'p95': percentile(timings, 95),
+        }
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+from recipe.images import process_recipe_image
+from recipe.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Построение уменьшенных копий картинок рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Пересобрать копии даже для уже обработанных картинок'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        processed = 0
+        failed = 0
+        recipe_ids = Recipe.objects.exclude(image='').order_by(
+            'id'
+        ).values_list('id', flat=True)
+        for recipe_id in recipe_ids.iterator():
+            try:
+                if process_recipe_image(recipe_id, force=options['force']):
+                    processed += 1
+            except Exception as error:
+                failed += 1
+                self.stderr.write(f'Рецепт {recipe_id}: {error}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано картинок: {processed}, ошибок: {failed} '
+            f'за {time.monotonic() - started:.2f} с'
+        ))
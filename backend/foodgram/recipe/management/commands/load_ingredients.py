@@ -0,0 +1,162 @@
+import csv
+import json
+import re
+import time
+from io import StringIO
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from recipe.models import Ingredient, LastModified
+
+JSON_READ_SIZE = 1 << 16
+JSON_SEPARATORS = re.compile(r'[\s\[\],]*')
+
+
+def batched(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def read_csv(file, delimiter):
+    for row in csv.reader(file, delimiter=delimiter):
+        if len(row) >= 2 and row[0].strip():
+            yield row[0].strip(), row[1].strip()
+
+
+def iter_json_objects(file):
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    eof = False
+    while True:
+        position = JSON_SEPARATORS.match(buffer, position).end()
+        if position < len(buffer):
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise CommandError(
+                        f'Некорректный JSON в позиции {position}'
+                    )
+            else:
+                yield item
+                continue
+        elif eof:
+            return
+        chunk = file.read(JSON_READ_SIZE)
+        eof = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+
+def read_json(file):
+    for index, item in enumerate(iter_json_objects(file)):
+        if not isinstance(item, dict):
+            raise CommandError(
+                f'Элемент {index} не является объектом: {item!r:.50}'
+            )
+        name = str(item.get('name', '')).strip()
+        if name:
+            yield name, str(item.get('measurement_unit', '')).strip()
+
+
+class Command(BaseCommand):
+    help = 'Загрузка ингредиентов из CSV или JSON файла'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу с ингредиентами')
+        parser.add_argument(
+            '--format',
+            choices=['csv', 'json', 'jsonl'],
+            help='Формат файла, по умолчанию определяется по расширению'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Количество строк в одной пачке'
+        )
+        parser.add_argument(
+            '--delimiter',
+            default=',',
+            help='Разделитель полей CSV'
+        )
+        parser.add_argument(
+            '--no-copy',
+            action='store_true',
+            help='Не использовать COPY даже на PostgreSQL'
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.is_file():
+            raise CommandError(f'Файл {path} не найден')
+        if options['batch_size'] < 1:
+            raise CommandError('Размер пачки должен быть положительным')
+        file_format = options['format'] or path.suffix.lstrip('.').lower()
+        if file_format not in ('csv', 'json', 'jsonl'):
+            raise CommandError(f'Неизвестный формат файла: {file_format}')
+        use_copy = connection.vendor == 'postgresql' and not options['no_copy']
+        started = time.monotonic()
+        with path.open(encoding='utf-8', newline='') as file:
+            if file_format == 'csv':
+                rows = read_csv(file, options['delimiter'])
+            else:
+                rows = read_json(file)
+            if use_copy:
+                processed = self.copy_rows(rows, options['batch_size'])
+            else:
+                processed = self.bulk_create_rows(rows, options['batch_size'])
+        LastModified.touch('ingredient')
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано строк: {processed} за {elapsed:.2f} с '
+            f'({processed / max(elapsed, 1e-6):.0f} строк/с)'
+        ))
+
+    def bulk_create_rows(self, rows, batch_size):
+        processed = 0
+        for batch in batched(rows, batch_size):
+            Ingredient.objects.bulk_create(
+                [Ingredient(name=name, measurement_unit=measurement_unit)
+                 for name, measurement_unit in batch],
+                ignore_conflicts=True
+            )
+            processed += len(batch)
+        return processed
+
+    def copy_rows(self, rows, batch_size):
+        table = connection.ops.quote_name(Ingredient._meta.db_table)
+        processed = 0
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMP TABLE ingredient_load '
+                '(name varchar(200), measurement_unit varchar(200)) '
+                'ON COMMIT DROP'
+            )
+            for batch in batched(rows, batch_size):
+                buffer = StringIO()
+                csv.writer(buffer).writerows(batch)
+                buffer.seek(0)
+                cursor.copy_expert(
+                    'COPY ingredient_load (name, measurement_unit) '
+                    'FROM STDIN WITH (FORMAT csv, '
+                    'FORCE_NOT_NULL (name, measurement_unit))',
+                    buffer
+                )
+                processed += len(batch)
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit) '
+                'SELECT DISTINCT name, measurement_unit FROM ingredient_load '
+                'ON CONFLICT (name, measurement_unit) DO NOTHING'
+            )
+            self.stdout.write(
+                f'Добавлено новых ингредиентов: {cursor.rowcount}'
+            )
+        return processed
@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from recipe.feed import rebuild_inbox
+from recipe.models import FeedItem
+
+
+class Command(BaseCommand):
+    help = 'Пересборка материализованных лент подписок'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        with transaction.atomic():
+            rebuild_inbox()
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Записей в лентах: {FeedItem.objects.count()} '
+            f'за {elapsed:.2f} с'
+        ))
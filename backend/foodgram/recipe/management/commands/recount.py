@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from recipe.counters import recount_recipes, recount_users
+
+
+class Command(BaseCommand):
+    help = 'Пересчет счетчиков избранного, корзины, рецептов и подписчиков'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        with transaction.atomic():
+            recipes = recount_recipes()
+            users = recount_users()
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано рецептов: {recipes}, пользователей: {users} '
+            f'за {time.monotonic() - started:.2f} с'
+        ))
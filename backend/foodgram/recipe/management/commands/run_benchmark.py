@@ -0,0 +1,238 @@
+import json
+import platform
+import resource
+import time
+from pathlib import Path
+
+from api.instrumentation import QueryRecorder
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, F, Sum
+from django.test import Client
+from django.utils import timezone
+from foodgram.settings import CURSOR_PAGE_SIZE
+from recipe.feed import get_feed
+from recipe.models import (FeedItem, Follow, Ingredient, Recipe, RecipeCart,
+                           RecipeIngredient, Tag, User)
+from rest_framework.authtoken.models import Token
+
+from .seed_bench_data import BENCH_PREFIX
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    index = max(int(round(percent / 100 * len(ordered))) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def peak_rss_kb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if platform.system() == 'Darwin':
+        return peak // 1024
+    return peak
+
+
+class Command(BaseCommand):
+    help = 'Замер задержек и числа запросов к БД для основных эндпоинтов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--output',
+            help='Файл для сохранения результатов в JSON'
+        )
+        parser.add_argument(
+            '--compare',
+            help='JSON с результатами предыдущего запуска для сравнения'
+        )
+        parser.add_argument(
+            '--explain',
+            action='store_true',
+            help='Замерить запросы горячих путей и вывести их планы'
+        )
+        parser.add_argument(
+            '--no-cache',
+            action='store_true',
+            help='Очищать кеш перед каждым запросом'
+        )
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('Число итераций должно быть положительным')
+        user = User.objects.filter(
+            username__startswith=BENCH_PREFIX
+        ).annotate(
+            follows=Count('follower')
+        ).order_by('-follows', 'pk').first()
+        recipe = Recipe.objects.order_by('-favorites_count', 'pk').first()
+        if user is None or recipe is None:
+            raise CommandError(
+                'Нет данных, сначала выполните seed_bench_data'
+            )
+        token, _ = Token.objects.get_or_create(user=user)
+        client = Client(HTTP_AUTHORIZATION=f'Token {token.key}')
+        results = {}
+        for name, url in self.endpoints(recipe).items():
+            results[name] = self.measure(client, url, options)
+            self.report(name, results[name])
+        if FeedItem.objects.filter(user=user).exists():
+            for strategy in ('read', 'inbox'):
+                name = f'feed_query_{strategy}'
+                results[name] = self.measure_feed(user, strategy, options)
+                self.report(name, results[name])
+        plans = {}
+        if options['explain']:
+            hot_paths, plans = self.explain(user, recipe, options)
+            results.update(hot_paths)
+        payload = {
+            'created': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'iterations': options['iterations'],
+            'no_cache': options['no_cache'],
+            'recipes': Recipe.objects.count(),
+            'users': User.objects.count(),
+            'results': results,
+            'plans': plans,
+        }
+        if options['output']:
+            Path(options['output']).write_text(
+                json.dumps(payload, ensure_ascii=False, indent=2),
+                encoding='utf-8'
+            )
+        if options['compare']:
+            self.compare(results, options['compare'])
+
+    def endpoints(self, recipe):
+        tag = Tag.objects.order_by('pk').values_list('slug', flat=True)[0]
+        ingredient = Ingredient.objects.order_by('pk').values_list(
+            'name', flat=True
+        )[0]
+        return {
+            'recipes': '/api/recipes/?page=1&limit=6',
+            'recipes_deep': '/api/recipes/?page=50&limit=6',
+            'recipes_compact': '/api/recipes/?page=1&limit=6&compact=1',
+            'recipes_cursor': '/api/recipes/?pagination=cursor',
+            'recipes_tag': f'/api/recipes/?page=1&limit=6&tags={tag}',
+            'recipes_popular': '/api/recipes/?page=1&limit=6&ordering=popular',
+            'recipe_detail': f'/api/recipes/{recipe.pk}/',
+            'subscriptions': '/api/users/subscriptions/?recipes_limit=3',
+            'feed': '/api/recipes/feed/?page=1&limit=6',
+            'feed_cursor': '/api/recipes/feed/?pagination=cursor',
+            'ingredients': f'/api/ingredients/?name={ingredient[:2]}',
+            'download_cart': '/api/recipes/download_shopping_cart/',
+        }
+
+    def request(self, client, url, no_cache):
+        if no_cache:
+            cache.clear()
+        response = client.get(url)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    def measure(self, client, url, options):
+        return self.measure_calls(
+            url, lambda: self.request(client, url, options['no_cache']),
+            options
+        )
+
+    def measure_feed(self, user, strategy, options):
+        recipes = get_feed(user, strategy).with_related(
+            user
+        ).with_user_flags(user)
+        return self.measure_calls(
+            f'get_feed(strategy={strategy!r})',
+            lambda: list(recipes[:CURSOR_PAGE_SIZE]),
+            options
+        )
+
+    def measure_calls(self, label, call, options):
+        for _ in range(options['warmup']):
+            call()
+        timings = []
+        queries = []
+        for _ in range(options['iterations']):
+            recorder = QueryRecorder()
+            started = time.perf_counter()
+            with recorder.capture():
+                result = call()
+            timings.append((time.perf_counter() - started) * 1000)
+            queries.append(recorder.count)
+        return {
+            'url': label,
+            'status': getattr(result, 'status_code', None),
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'p99_ms': round(percentile(timings, 99), 2),
+            'queries': max(queries),
+            'peak_rss_kb': peak_rss_kb(),
+        }
+
+    def hot_paths(self, user, recipe):
+        tag = Tag.objects.order_by('pk').values_list('slug', flat=True)[0]
+        cart = RecipeCart.objects.filter(user=user).values('recipe')
+        return {
+            'is_subscribed': Follow.objects.filter(
+                user=user, author=recipe.author_id
+            ).values('pk'),
+            'followers': Follow.objects.filter(
+                author=recipe.author_id
+            ).values('user'),
+            'tag_recipes': Recipe.objects.filter(
+                tags__slug=tag
+            ).values('pk')[:CURSOR_PAGE_SIZE],
+            'favorited': Recipe.objects.filter(
+                id__in=user.recipes_in_fav.values('id')
+            ).values('pk')[:CURSOR_PAGE_SIZE],
+            'recipe_items': RecipeIngredient.objects.filter(
+                recipe=recipe
+            ).values('ingredient', 'amount'),
+            'cart_totals': RecipeIngredient.objects.filter(
+                recipe__in=cart
+            ).values(
+                name=F('ingredient__name'),
+                measurement_unit=F('ingredient__measurement_unit')
+            ).annotate(
+                sum=Sum('amount')
+            ).order_by('name', 'measurement_unit'),
+        }
+
+    def explain(self, user, recipe, options):
+        results = {}
+        plans = {}
+        explain_options = {}
+        if connection.vendor == 'postgresql':
+            explain_options = {'analyze': True, 'buffers': True}
+        for name, queryset in self.hot_paths(user, recipe).items():
+            plans[name] = queryset.explain(**explain_options)
+            results[name] = self.measure_calls(
+                str(queryset.query)[:200], lambda: list(queryset.all()),
+                options
+            )
+            self.report(name, results[name])
+            self.stdout.write(plans[name])
+        return results, plans
+
+    def report(self, name, result):
+        self.stdout.write(
+            f'{name:<16} {result["status"]} '
+            f'p50={result["p50_ms"]:.1f} p95={result["p95_ms"]:.1f} '
+            f'p99={result["p99_ms"]:.1f} мс, запросов: {result["queries"]}, '
+            f'RSS: {result["peak_rss_kb"] // 1024} МБ'
+        )
+
+    def compare(self, results, path):
+        previous = json.loads(Path(path).read_text(encoding='utf-8'))
+        self.stdout.write(f'Сравнение с {path}:')
+        for name, result in results.items():
+            before = previous['results'].get(name)
+            if before is None:
+                continue
+            change = (result['p50_ms'] / max(before['p50_ms'], 1e-6) - 1) * 100
+            self.stdout.write(
+                f'{name:<16} p50 {before["p50_ms"]:.1f} -> '
+                f'{result["p50_ms"]:.1f} мс ({change:+.0f}%), '
+                f'запросов {before["queries"]} -> {result["queries"]}'
+            )
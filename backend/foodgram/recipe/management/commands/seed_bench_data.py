@@ -0,0 +1,215 @@
+import random
+import time
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from recipe.counters import recount_recipes, recount_users
+from recipe.feed import rebuild_inbox
+from recipe.models import (Follow, Ingredient, LastModified, Recipe,
+                           RecipeCart, RecipeFavorites, RecipeIngredient,
+                           RecipeTag, Tag, User)
+from recipe.search import update_search_index
+
+BENCH_PREFIX = 'bench_'
+BENCH_PASSWORD = 'bench-password'
+
+
+class SkewedSampler:
+
+    def __init__(self, population, skew, rng):
+        self.population = list(population)
+        self.cum_weights = list(accumulate(
+            1 / (rank + 1) ** skew for rank in range(len(self.population))
+        ))
+        self.rng = rng
+
+    def sample(self, count, exclude=None):
+        count = min(count, len(self.population) - (exclude is not None))
+        chosen = set()
+        while len(chosen) < count:
+            for item in self.rng.choices(
+                self.population,
+                cum_weights=self.cum_weights,
+                k=count - len(chosen)
+            ):
+                if item != exclude:
+                    chosen.add(item)
+        return chosen
+
+
+class Command(BaseCommand):
+    help = 'Генерация синтетических данных для нагрузочного тестирования'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--ingredients', type=int, default=2000,
+                            help='Минимальное число ингредиентов в базе')
+        parser.add_argument('--tags', type=int, default=10)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--tags-per-recipe', type=int, default=2)
+        parser.add_argument('--follows', type=int, default=20,
+                            help='Подписок на пользователя')
+        parser.add_argument('--favorites', type=int, default=30,
+                            help='Избранных рецептов на пользователя')
+        parser.add_argument('--carts', type=int, default=5,
+                            help='Рецептов в корзине на пользователя')
+        parser.add_argument(
+            '--skew',
+            type=float,
+            default=1.1,
+            help='Показатель Ципфа для популярности авторов и рецептов, '
+                 '0 - равномерное распределение'
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--feed-inbox',
+            action='store_true',
+            help='Заполнить материализованные ленты подписок'
+        )
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Удалить ранее сгенерированные данные'
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 2 or options['recipes'] < 1:
+            raise CommandError('Нужно хотя бы 2 пользователя и 1 рецепт')
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        started = time.monotonic()
+        with transaction.atomic():
+            if options['clear']:
+                User.objects.filter(username__startswith=BENCH_PREFIX).delete()
+            elif User.objects.filter(
+                username__startswith=BENCH_PREFIX
+            ).exists():
+                raise CommandError(
+                    'Данные уже сгенерированы, используйте --clear'
+                )
+            users = self.create_users(options['users'])
+            tags = self.create_tags(options['tags'])
+            ingredients = self.create_ingredients(options['ingredients'])
+            authors = SkewedSampler(users, options['skew'], self.rng)
+            recipes = self.create_recipes(options['recipes'], authors)
+            self.link(
+                RecipeIngredient, 'ingredient', recipes, ingredients,
+                options['ingredients_per_recipe'], 0,
+                amount=lambda: self.rng.randint(1, 500)
+            )
+            self.link(
+                RecipeTag, 'tag', recipes, tags,
+                options['tags_per_recipe'], 0
+            )
+            self.link(
+                Follow, 'author', users, users, options['follows'],
+                options['skew'], owner='user', exclude_self=True
+            )
+            popular = list(recipes)
+            self.rng.shuffle(popular)
+            for model, count in (
+                (RecipeFavorites, options['favorites']),
+                (RecipeCart, options['carts'])
+            ):
+                self.link(
+                    model, 'recipe', users, popular, count,
+                    options['skew'], owner='user'
+                )
+            recount_recipes(Recipe.objects.filter(pk__in=recipes))
+            recount_users(User.objects.filter(pk__in=users))
+            update_search_index(recipes)
+            if options['feed_inbox']:
+                rebuild_inbox(users)
+        for key in ('recipe', 'tag', 'ingredient'):
+            LastModified.touch(key)
+        self.stdout.write(self.style.SUCCESS(
+            f'Пользователей: {len(users)}, рецептов: {len(recipes)} '
+            f'за {time.monotonic() - started:.2f} с'
+        ))
+
+    def bulk_create(self, objects):
+        objects = list(objects)
+        if objects:
+            type(objects[0]).objects.bulk_create(
+                objects,
+                batch_size=self.batch_size,
+                ignore_conflicts=True
+            )
+
+    def create_users(self, count):
+        password = make_password(BENCH_PASSWORD)
+        self.bulk_create(
+            User(
+                username=f'{BENCH_PREFIX}{number}',
+                email=f'{BENCH_PREFIX}{number}@example.com',
+                first_name='Bench',
+                last_name=str(number),
+                password=password
+            )
+            for number in range(count)
+        )
+        return list(User.objects.filter(
+            username__startswith=BENCH_PREFIX
+        ).order_by('pk').values_list('pk', flat=True))
+
+    def create_tags(self, count):
+        self.bulk_create(
+            Tag(
+                name=f'{BENCH_PREFIX}{number}',
+                slug=f'{BENCH_PREFIX}{number}',
+                color=f'#{self.rng.randrange(1 << 24):06x}'
+            )
+            for number in range(count)
+        )
+        return list(Tag.objects.values_list('pk', flat=True))
+
+    def create_ingredients(self, count):
+        missing = count - Ingredient.objects.count()
+        self.bulk_create(
+            Ingredient(
+                name=f'{BENCH_PREFIX}{number}',
+                measurement_unit=self.rng.choice(['г', 'мл', 'шт'])
+            )
+            for number in range(max(missing, 0))
+        )
+        return list(Ingredient.objects.values_list('pk', flat=True))
+
+    def create_recipes(self, count, authors):
+        author_ids = self.rng.choices(
+            authors.population, cum_weights=authors.cum_weights, k=count
+        )
+        self.bulk_create(
+            Recipe(
+                name=f'{BENCH_PREFIX}{number}',
+                text='Синтетический рецепт для нагрузочного тестирования',
+                cooking_time=self.rng.randint(5, 180),
+                author_id=author_id
+            )
+            for number, author_id in enumerate(author_ids)
+        )
+        return list(Recipe.objects.filter(
+            author__in=authors.population
+        ).values_list('pk', flat=True))
+
+    def link(self, model, field, owners, targets, per_owner, skew,
+             owner='recipe', exclude_self=False, amount=None):
+        sampler = SkewedSampler(targets, skew, self.rng)
+        rows = []
+        for owner_id in owners:
+            exclude = owner_id if exclude_self else None
+            for target_id in sampler.sample(per_owner, exclude):
+                row = model(**{
+                    f'{owner}_id': owner_id,
+                    f'{field}_id': target_id
+                })
+                if amount is not None:
+                    row.amount = amount()
+                rows.append(row)
+            if len(rows) >= self.batch_size:
+                self.bulk_create(rows)
+                rows = []
+        self.bulk_create(rows)
@@ -0,0 +1,87 @@
+import time
+from collections import defaultdict
+from datetime import timedelta
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Value, When
+from django.utils import timezone
+from foodgram.settings import (TRENDING_CART_WEIGHT, TRENDING_FAVORITE_WEIGHT,
+                               TRENDING_HALF_LIFE_HOURS, TRENDING_MIN_SCORE,
+                               TRENDING_WINDOW_HALF_LIVES)
+from recipe.models import LastModified, Recipe, RecipeCart, RecipeFavorites
+
+TRENDING_KEY = 'trending'
+UPDATE_BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = 'Пересчет трендового рейтинга рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Пересчитать рейтинг с нуля, а не от прошлого запуска'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        now = timezone.now()
+        half_life = TRENDING_HALF_LIFE_HOURS * 3600
+        last_run = None
+        if not options['full']:
+            last_run = LastModified.objects.filter(
+                key=TRENDING_KEY
+            ).values_list('modified_at', flat=True).first()
+        with transaction.atomic():
+            scored = Recipe.objects.filter(trending_score__gt=0)
+            if last_run is None:
+                scored.update(trending_score=0)
+                since = now - timedelta(
+                    hours=TRENDING_HALF_LIFE_HOURS * TRENDING_WINDOW_HALF_LIVES
+                )
+            else:
+                factor = 0.5 ** ((now - last_run).total_seconds() / half_life)
+                scored.update(trending_score=F('trending_score') * factor)
+                scored.filter(
+                    trending_score__lt=TRENDING_MIN_SCORE
+                ).update(trending_score=0)
+                since = last_run
+            gains = defaultdict(float)
+            for model, weight in (
+                (RecipeFavorites, TRENDING_FAVORITE_WEIGHT),
+                (RecipeCart, TRENDING_CART_WEIGHT)
+            ):
+                events = model.objects.filter(
+                    created__gt=since,
+                    created__lte=now
+                ).values_list('recipe_id', 'created')
+                for recipe_id, created in events.iterator():
+                    age = (now - created).total_seconds()
+                    gains[recipe_id] += weight * 0.5 ** (age / half_life)
+            self.add_gains(gains)
+            LastModified.objects.update_or_create(
+                key=TRENDING_KEY,
+                defaults={'modified_at': now}
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено рецептов: {len(gains)} '
+            f'за {time.monotonic() - started:.2f} с'
+        ))
+
+    def add_gains(self, gains):
+        items = iter(gains.items())
+        while True:
+            batch = list(islice(items, UPDATE_BATCH_SIZE))
+            if not batch:
+                return
+            Recipe.objects.filter(
+                pk__in=[recipe_id for recipe_id, _ in batch]
+            ).update(trending_score=F('trending_score') + Case(
+                *[When(pk=recipe_id, then=Value(gain))
+                  for recipe_id, gain in batch],
+                default=Value(0.0),
+                output_field=FloatField()
+            ))
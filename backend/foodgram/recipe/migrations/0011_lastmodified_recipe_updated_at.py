@@ -0,0 +1,30 @@
+# Generated by Django 4.0.5 on 2026-10-18 05:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0010_recipe_pub_date_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LastModified',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='Таблица или пользователь', max_length=64, unique=True, verbose_name='key')),
+                ('modified_at', models.DateTimeField(help_text='Время последнего изменения', verbose_name='modified_at')),
+            ],
+            options={
+                'verbose_name': 'Отметка изменения',
+                'verbose_name_plural': 'Отметки изменений',
+            },
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, help_text='Дата последнего изменения', verbose_name='updated_at'),
+        ),
+    ]
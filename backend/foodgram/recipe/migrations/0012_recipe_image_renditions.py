@@ -0,0 +1,18 @@
+# Generated by Django 4.0.5 on 2026-10-18 05:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0011_lastmodified_recipe_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_renditions',
+            field=models.JSONField(blank=True, default=dict, help_text='Уменьшенные копии картинки', verbose_name='image_renditions'),
+        ),
+    ]
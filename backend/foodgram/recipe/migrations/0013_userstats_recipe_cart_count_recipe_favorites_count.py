@@ -0,0 +1,73 @@
+# Generated by Django 4.0.5 on 2026-10-18 05:33
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def count_subquery(model, field, outer_field):
+    return Coalesce(Subquery(
+        model.objects.filter(
+            **{field: OuterRef(outer_field)}
+        ).order_by().values(field).annotate(
+            total=Count('*')
+        ).values('total')
+    ), 0)
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model('recipe', 'Recipe')
+    RecipeFavorites = apps.get_model('recipe', 'RecipeFavorites')
+    RecipeCart = apps.get_model('recipe', 'RecipeCart')
+    Follow = apps.get_model('recipe', 'Follow')
+    UserStats = apps.get_model('recipe', 'UserStats')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Recipe.objects.update(
+        favorites_count=count_subquery(RecipeFavorites, 'recipe', 'pk'),
+        cart_count=count_subquery(RecipeCart, 'recipe', 'pk')
+    )
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=user_id)
+         for user_id in User.objects.values_list('pk', flat=True)],
+        batch_size=1000
+    )
+    UserStats.objects.update(
+        recipes_count=count_subquery(Recipe, 'author', 'user'),
+        followers_count=count_subquery(Follow, 'author', 'user')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('recipe', '0012_recipe_image_renditions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(help_text='Пользователь', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='user')),
+                ('recipes_count', models.PositiveIntegerField(default=0, help_text='Количество рецептов', verbose_name='recipes_count')),
+                ('followers_count', models.PositiveIntegerField(default=0, help_text='Количество подписчиков', verbose_name='followers_count')),
+            ],
+            options={
+                'verbose_name': 'Счетчики пользователя',
+                'verbose_name_plural': 'Счетчики пользователей',
+            },
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='cart_count',
+            field=models.PositiveIntegerField(default=0, help_text='Количество добавлений в корзину', verbose_name='cart_count'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, help_text='Количество добавлений в избранное', verbose_name='favorites_count'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.0.5 on 2026-10-18 05:34
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0013_userstats_recipe_cart_count_recipe_favorites_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='trending_score',
+            field=models.FloatField(default=0, help_text='Популярность с затуханием по времени', verbose_name='trending_score'),
+        ),
+        migrations.AddField(
+            model_name='recipecart',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, help_text='Дата добавления', verbose_name='created'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='recipefavorites',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, help_text='Дата добавления', verbose_name='created'),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-favorites_count', '-id'], name='recipe_favorites_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-trending_score', '-id'], name='recipe_trending_score_idx'),
+        ),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 4.0.5 on 2026-10-18 05:48
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+SEARCH_INDEX = django.contrib.postgres.indexes.GinIndex(
+    fields=['search_vector'], name='recipe_search_vector_idx'
+)
+FTS_TABLE = 'recipe_recipe_fts'
+
+
+def create_search_index(apps, schema_editor):
+    Recipe = apps.get_model('recipe', 'Recipe')
+    RecipeIngredient = apps.get_model('recipe', 'RecipeIngredient')
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.add_index(Recipe, SEARCH_INDEX)
+        names = Subquery(
+            RecipeIngredient.objects.filter(
+                recipe=OuterRef('pk')
+            ).order_by().values('recipe').annotate(
+                names=StringAgg('ingredient__name', ' ')
+            ).values('names')
+        )
+        Recipe.objects.update(search_vector=(
+            SearchVector('name', weight='A', config='russian')
+            + SearchVector(names, weight='B', config='russian')
+            + SearchVector('text', weight='C', config='russian')
+        ))
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5('
+            'name, ingredients, text, '
+            'tokenize="unicode61 remove_diacritics 2")'
+        )
+        schema_editor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, ingredients, text) '
+            'SELECT recipe.id, recipe.name, ('
+            'SELECT group_concat(ingredient.name, \' \') '
+            'FROM recipe_recipeingredient AS link '
+            'JOIN recipe_ingredient AS ingredient '
+            'ON ingredient.id = link.ingredient_id '
+            'WHERE link.recipe_id = recipe.id'
+            '), recipe.text FROM recipe_recipe AS recipe'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    Recipe = apps.get_model('recipe', 'Recipe')
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.remove_index(Recipe, SEARCH_INDEX)
+    elif vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0014_recipe_trending_score_recipecart_created_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, help_text='Поисковый вектор по названию, ингредиентам и описанию', null=True, verbose_name='search_vector'),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='recipe',
+                    index=SEARCH_INDEX,
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(create_search_index, drop_search_index),
+            ],
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.0.5 on 2026-10-18 06:06
+
+from datetime import timedelta
+
+from django.db import migrations
+from django.db.models import Count
+
+
+def spread_pub_dates(apps, schema_editor):
+    # Рецептам, созданным до 0010, досталась одна и та же дата публикации,
+    # и курсорная пагинация по (-pub_date, -id) сводилась к OFFSET.
+    # Разносим совпадающие даты на id микросекунд, порядок при этом
+    # не меняется.
+    Recipe = apps.get_model('recipe', 'Recipe')
+    duplicated = Recipe.objects.values('pub_date').annotate(
+        total=Count('id')
+    ).filter(total__gt=1).values_list('pub_date', flat=True)
+    for pub_date in list(duplicated):
+        recipes = [
+            Recipe(id=recipe_id, pub_date=pub_date + timedelta(
+                microseconds=recipe_id
+            ))
+            for recipe_id in Recipe.objects.filter(
+                pub_date=pub_date
+            ).values_list('id', flat=True)
+        ]
+        Recipe.objects.bulk_update(recipes, ['pub_date'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0017_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(spread_pub_dates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.0.5 on 2026-10-18 07:12
+
+from django.db import migrations
+from django.utils import timezone
+
+KEYS = ('recipe', 'tag', 'ingredient', 'author', 'popular', 'trending')
+
+
+def seed_last_modified(apps, schema_editor):
+    # Без строк-отметок Last-Modified у списков пуст до первого изменения,
+    # и условные запросы к уже существующим данным не срабатывают.
+    LastModified = apps.get_model('recipe', 'LastModified')
+    now = timezone.now()
+    LastModified.objects.bulk_create(
+        [LastModified(key=key, modified_at=now) for key in KEYS],
+        ignore_conflicts=True
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0018_backfill_pub_date'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_last_modified, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,10 @@
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import Exists, Max, OuterRef, Prefetch, Value
+from django.utils import timezone
 from foodgram.settings import MIN_COOKING_TIME, MIN_INGREDIENT_AMOUNT
 
 User = get_user_model()
@@ -55,6 +59,69 @@ class Ingredient(models.Model):
         ]
 
 
+class RecipeQuerySet(models.QuerySet):
+
+    def with_related(self, user, fields=None):
+        lookups = []
+        if fields is None or 'author' in fields:
+            if user.is_authenticated:
+                is_subscribed = Exists(Follow.objects.filter(
+                    user=user,
+                    author=OuterRef('pk')
+                ))
+            else:
+                is_subscribed = Value(False)
+            lookups.append(Prefetch(
+                'author',
+                queryset=User.objects.annotate(is_subscribed=is_subscribed)
+            ))
+        if fields is None or 'tags' in fields:
+            lookups.append('tags')
+        if fields is None or 'ingredients' in fields:
+            lookups.append(Prefetch(
+                'recipeingredient_set',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            ))
+        return self.prefetch_related(*lookups)
+
+    def with_user_flags(self, user, fields=None):
+        flags = {
+            'is_favorited': RecipeFavorites,
+            'is_in_shopping_cart': RecipeCart,
+        }
+        annotations = {}
+        for name, model in flags.items():
+            if fields is not None and name not in fields:
+                continue
+            if user.is_authenticated:
+                annotations[name] = Exists(model.objects.filter(
+                    user=user,
+                    recipe=OuterRef('pk')
+                ))
+            else:
+                annotations[name] = Value(False)
+        return self.annotate(**annotations)
+
+    def defer_omitted(self, fields):
+        if fields is None:
+            return self
+        deferred = {'text', 'image_renditions'} - set(fields)
+        if not {'image', 'image_renditions'} & set(fields):
+            deferred.add('image')
+        return self.defer(*deferred)
+
+    def limit_per_author(self, limit, ordering=('id',)):
+        return self.filter(id__in=self.model.objects.filter(
+            author=OuterRef('author')
+        ).order_by(*ordering).values('id')[:limit])
+
+
+class RecipeManager(models.Manager.from_queryset(RecipeQuerySet)):
+
+    def get_queryset(self):
+        return super().get_queryset().defer('search_vector')
+
+
 class Recipe(models.Model):
     name = models.CharField(
         max_length=200,
@@ -66,6 +133,12 @@ class Recipe(models.Model):
         upload_to='recipe/',
         blank=True  # !!! убрать
     )
+    image_renditions = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='image_renditions',
+        help_text='Уменьшенные копии картинки'
+    )
     text = models.TextField(
         verbose_name='description',
         help_text='Описание'
@@ -112,16 +185,73 @@ class Recipe(models.Model):
         verbose_name='author',
         help_text='Автор рецепта'
     )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='favorites_count',
+        help_text='Количество добавлений в избранное'
+    )
+    cart_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='cart_count',
+        help_text='Количество добавлений в корзину'
+    )
+    trending_score = models.FloatField(
+        default=0,
+        verbose_name='trending_score',
+        help_text='Популярность с затуханием по времени'
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name='search_vector',
+        help_text='Поисковый вектор по названию, ингредиентам и описанию'
+    )
+    pub_date = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='pub_date',
+        help_text='Дата публикации'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='updated_at',
+        help_text='Дата последнего изменения'
+    )
+
+    objects = RecipeManager()
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        ordering = ['-pub_date', '-id']
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='recipe_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=['-favorites_count', '-id'],
+                name='recipe_favorites_count_idx'
+            ),
+            models.Index(
+                fields=['-trending_score', '-id'],
+                name='recipe_trending_score_idx'
+            ),
+            GinIndex(
+                fields=['search_vector'],
+                name='recipe_search_vector_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='recipe_author_pub_date_idx'
+            )
+        ]
 
 
 class RecipeIngredient(models.Model):
     recipe = models.ForeignKey(
         Recipe,
         on_delete=models.CASCADE,
+        db_index=False,
         verbose_name='recipes',
         help_text='Рецепт'
     )
@@ -148,18 +278,27 @@ class RecipeIngredient(models.Model):
                 name='unique_recipe_ingredient'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['recipe'],
+                include=['ingredient', 'amount'],
+                name='recipe_ingredient_cover_idx'
+            )
+        ]
 
 
 class RecipeTag(models.Model):
     recipe = models.ForeignKey(
         Recipe,
         on_delete=models.CASCADE,
+        db_index=False,
         verbose_name='recipe',
         help_text='Рецепт'
     )
     tag = models.ForeignKey(
         Tag,
         on_delete=models.CASCADE,
+        db_index=False,
         verbose_name='tag',
         help_text='Тэг'
     )
@@ -173,17 +312,25 @@ class RecipeTag(models.Model):
                 name='unique_recipe_tag'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['tag', 'recipe'],
+                name='recipe_tag_tag_recipe_idx'
+            )
+        ]
 
 
 class Follow(models.Model):
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
+        db_index=False,
         related_name='follower'
     )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
+        db_index=False,
         related_name='following'
     )
 
@@ -196,12 +343,19 @@ class Follow(models.Model):
                 name='unique_follow'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user_idx'
+            )
+        ]
 
 
 class RecipeFavorites(models.Model):
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
+        db_index=False,
         verbose_name='user',
         help_text='Пользователь'
     )
@@ -211,6 +365,11 @@ class RecipeFavorites(models.Model):
         verbose_name='recipe',
         help_text='Рецепт в избранном'
     )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='created',
+        help_text='Дата добавления'
+    )
 
     class Meta:
         verbose_name = 'Рецепт в списке избранных'
@@ -227,6 +386,7 @@ class RecipeCart(models.Model):
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
+        db_index=False,
         verbose_name='user',
         help_text='Пользователь'
     )
@@ -236,6 +396,11 @@ class RecipeCart(models.Model):
         verbose_name='recipe',
         help_text='Рецепт в корзине'
     )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='created',
+        help_text='Дата добавления'
+    )
 
     class Meta:
         verbose_name = 'Рецепт в корзине'
@@ -246,3 +411,100 @@ class RecipeCart(models.Model):
                 name='unique_recipe_cart'
             )
         ]
+
+
+class LastModified(models.Model):
+    key = models.CharField(
+        max_length=64,
+        unique=True,
+        verbose_name='key',
+        help_text='Таблица или пользователь'
+    )
+    modified_at = models.DateTimeField(
+        verbose_name='modified_at',
+        help_text='Время последнего изменения'
+    )
+
+    class Meta:
+        verbose_name = 'Отметка изменения'
+        verbose_name_plural = 'Отметки изменений'
+
+    @classmethod
+    def touch(cls, key):
+        now = timezone.now()
+        if cls.objects.filter(key=key).update(modified_at=now):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(key=key, modified_at=now)
+        except IntegrityError:
+            cls.objects.filter(key=key).update(modified_at=now)
+
+    @classmethod
+    def get(cls, *keys):
+        return cls.objects.filter(key__in=keys).aggregate(
+            last=Max('modified_at')
+        )['last']
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='user',
+        help_text='Пользователь'
+    )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='recipes_count',
+        help_text='Количество рецептов'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='followers_count',
+        help_text='Количество подписчиков'
+    )
+
+    class Meta:
+        verbose_name = 'Счетчики пользователя'
+        verbose_name_plural = 'Счетчики пользователей'
+
+
+class FeedItem(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        db_index=False,
+        related_name='feed_items',
+        verbose_name='user',
+        help_text='Подписчик'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_items',
+        verbose_name='recipe',
+        help_text='Рецепт автора, на которого подписан пользователь'
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='pub_date',
+        help_text='Дата публикации рецепта'
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_feed_item'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-recipe'],
+                name='feed_item_user_pub_date_idx'
+            )
+        ]
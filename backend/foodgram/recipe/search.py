@@ -0,0 +1,98 @@
+import re
+from itertools import islice
+
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import connection, connections
+from django.db.models import F, FloatField, OuterRef, Q, Subquery
+from django.db.models.expressions import RawSQL
+from foodgram.settings import SEARCH_CONFIG
+
+from .models import Ingredient, Recipe, RecipeIngredient
+
+FTS_TABLE = 'recipe_recipe_fts'
+SEARCH_BATCH_SIZE = 500
+WORD = re.compile(r'\w+')
+
+
+def ingredient_names():
+    return Subquery(
+        RecipeIngredient.objects.filter(
+            recipe=OuterRef('pk')
+        ).order_by().values('recipe').annotate(
+            names=StringAgg('ingredient__name', ' ')
+        ).values('names')
+    )
+
+
+def search_vector():
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector(ingredient_names(), weight='B', config=SEARCH_CONFIG)
+        + SearchVector('text', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def update_fts(cursor, recipe_ids):
+    placeholders = ', '.join(['%s'] * len(recipe_ids))
+    cursor.execute(
+        f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})',
+        recipe_ids
+    )
+    cursor.execute(
+        f'INSERT INTO {FTS_TABLE} (rowid, name, ingredients, text) '
+        f'SELECT recipe.id, recipe.name, ('
+        f'SELECT group_concat(ingredient.name, \' \') '
+        f'FROM {RecipeIngredient._meta.db_table} AS link '
+        f'JOIN {Ingredient._meta.db_table} AS ingredient '
+        f'ON ingredient.id = link.ingredient_id '
+        f'WHERE link.recipe_id = recipe.id'
+        f'), recipe.text FROM {Recipe._meta.db_table} AS recipe '
+        f'WHERE recipe.id IN ({placeholders})',
+        recipe_ids
+    )
+
+
+def update_search_index(recipe_ids=None):
+    if recipe_ids is None:
+        recipe_ids = Recipe.objects.values_list('pk', flat=True).iterator()
+    recipe_ids = iter(recipe_ids)
+    while True:
+        batch = list(islice(recipe_ids, SEARCH_BATCH_SIZE))
+        if not batch:
+            return
+        if connection.vendor == 'postgresql':
+            Recipe.objects.filter(pk__in=batch).update(
+                search_vector=search_vector()
+            )
+        elif connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                update_fts(cursor, batch)
+
+
+def search_recipes(queryset, value):
+    words = WORD.findall(value)
+    if not words:
+        return queryset
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        query = SearchQuery(
+            value, config=SEARCH_CONFIG, search_type='websearch'
+        )
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        ).order_by('-search_rank', '-id')
+    if vendor == 'sqlite':
+        match = ' '.join(f'"{word}"*' for word in words)
+        return queryset.annotate(search_rank=RawSQL(
+            f'SELECT -bm25({FTS_TABLE}, 10.0, 5.0, 1.0) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s '
+            f'AND rowid = {Recipe._meta.db_table}.id',
+            (match,),
+            output_field=FloatField()
+        )).filter(search_rank__isnull=False).order_by('-search_rank', '-id')
+    condition = Q()
+    for word in words:
+        condition &= Q(name__icontains=word) | Q(text__icontains=word)
+    return queryset.filter(condition)
@@ -0,0 +1,72 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .counters import (change_recipe_counter, change_user_counter,
+                       in_bulk_changes)
+from .feed import INBOX_ENABLED, add_authors, fan_out, remove_authors
+from .models import (Follow, Recipe, RecipeCart, RecipeFavorites, User,
+                     UserStats)
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, **kwargs):
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=RecipeFavorites)
+@receiver(post_save, sender=RecipeCart)
+@receiver(post_delete, sender=RecipeFavorites)
+@receiver(post_delete, sender=RecipeCart)
+def update_recipe_counters(sender, instance, **kwargs):
+    if kwargs.get('created') is False or in_bulk_changes():
+        return
+    field = (
+        'favorites_count' if sender is RecipeFavorites else 'cart_count'
+    )
+    delta = -1 if kwargs['signal'] is post_delete else 1
+    change_recipe_counter(field, [instance.recipe_id], delta)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def update_recipes_count(sender, instance, **kwargs):
+    if kwargs.get('created') is False or in_bulk_changes():
+        return
+    delta = -1 if kwargs['signal'] is post_delete else 1
+    change_user_counter('recipes_count', [instance.author_id], delta)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def update_followers_count(sender, instance, **kwargs):
+    if kwargs.get('created') is False or in_bulk_changes():
+        return
+    delta = -1 if kwargs['signal'] is post_delete else 1
+    change_user_counter('followers_count', [instance.author_id], delta)
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_recipe(sender, instance, created, **kwargs):
+    if created and INBOX_ENABLED:
+        transaction.on_commit(partial(
+            fan_out, instance.pk, instance.author_id, instance.pub_date
+        ))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def update_feed_inbox(sender, instance, **kwargs):
+    if (
+        not INBOX_ENABLED
+        or kwargs.get('created') is False
+        or in_bulk_changes()
+    ):
+        return
+    if kwargs['signal'] is post_delete:
+        remove_authors(instance.user_id, [instance.author_id])
+    else:
+        add_authors(instance.user_id, [instance.author_id])
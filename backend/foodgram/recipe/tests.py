@@ -0,0 +1,78 @@
+from django.test import TestCase
+
+from .counters import delete_with_counters, recount_recipes, recount_users
+from .models import (Follow, Recipe, RecipeCart, RecipeFavorites, User,
+                     UserStats)
+
+
+class UserCountersTest(TestCase):
+
+    def setUp(self):
+        self.author = User.objects.create_user(
+            username='author', email='author@foodgram.ru', password='pass'
+        )
+        self.reader = User.objects.create_user(
+            username='reader', email='reader@foodgram.ru', password='pass'
+        )
+        self.other = User.objects.create_user(
+            username='other', email='other@foodgram.ru', password='pass'
+        )
+        self.recipes = [
+            Recipe.objects.create(
+                name=f'Рецепт {index}',
+                text='Описание',
+                cooking_time=10,
+                author=self.author
+            )
+            for index in range(3)
+        ]
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.author, author=self.other)
+        RecipeFavorites.objects.create(
+            user=self.reader, recipe=self.recipes[0]
+        )
+
+    def test_delete_user_with_recipes_and_followers(self):
+        self.author.delete()
+        self.assertFalse(User.objects.filter(pk=self.author.pk).exists())
+        self.assertFalse(
+            UserStats.objects.filter(user=self.author.pk).exists()
+        )
+        self.assertEqual(
+            UserStats.objects.get(user=self.other).followers_count, 0
+        )
+
+    def test_counters_match_recount(self):
+        stats = UserStats.objects.get(user=self.author)
+        self.assertEqual(stats.recipes_count, 3)
+        self.assertEqual(stats.followers_count, 1)
+        self.recipes[0].delete()
+        Follow.objects.filter(user=self.reader).delete()
+        counted = list(UserStats.objects.order_by('pk').values_list(
+            'recipes_count', 'followers_count'
+        ))
+        recount_users()
+        self.assertEqual(counted, list(
+            UserStats.objects.order_by('pk').values_list(
+                'recipes_count', 'followers_count'
+            )
+        ))
+
+    def test_delete_with_counters(self):
+        RecipeCart.objects.create(user=self.reader, recipe=self.recipes[1])
+        delete_with_counters(Recipe.objects.filter(pk=self.recipes[2].pk))
+        delete_with_counters(User.objects.filter(pk=self.reader.pk))
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).recipes_count, 2
+        )
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).followers_count, 0
+        )
+        counted = list(Recipe.objects.order_by('pk').values_list(
+            'favorites_count', 'cart_count'
+        ))
+        self.assertEqual(counted, [(0, 0), (0, 0)])
+        recount_recipes()
+        self.assertEqual(counted, list(Recipe.objects.order_by(
+            'pk'
+        ).values_list('favorites_count', 'cart_count')))